@@ -0,0 +1,228 @@
+"""Benchmarks for the models layer and the page view builders.
+
+    python -m benchmarks.bench                         # run and print a report
+    python -m benchmarks.bench --sizes 10 1000         # smaller matrix
+    python -m benchmarks.bench --save benchmarks/baseline.json
+    python -m benchmarks.bench --compare benchmarks/baseline.json [--threshold 1.25]
+
+Each case reports latency percentiles (p50/p95/p99, microseconds) and, for one
+extra instrumented run, the number of memory blocks allocated and the peak
+traced memory. View builders run against a FakePage, no Flet server needed
+(Flet itself must be installed; otherwise those cases are skipped).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from smart_home import models
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+
+
+# ================================
+# FAKE PAGE (headless)
+# ================================
+class FakePage:
+    """Just enough of ft.Page for the view builders: update() does nothing."""
+
+    def __init__(self):
+        self.route = "/"
+        self.overlay = []
+        self.controls = []
+        self.appbar = None
+        self.on_route_change = None
+        self.on_close = None
+        self.updates = 0
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def go(self, route):
+        self.route = route
+
+
+# ================================
+# FIXTURES
+# ================================
+def device_id(i: int) -> str:
+    # Mismos ids que generaria create_device("Device") repetido: peor caso de colisiones
+    return "device" if i == 0 else f"device_{i}"
+
+
+def populate(n_devices: int, n_log: int, n_rooms: int = 10):
+    """Replace the model state with n_devices devices, n_rooms rooms and n_log log entries."""
+    types = ["switch", "lock", "slider"]
+    defaults = {"switch": "OFF", "lock": "LOCKED", "slider": 0}
+    devices = []
+    for i in range(n_devices):
+        t = types[i % 3]
+        devices.append({"id": device_id(i), "name": f"Device {i}", "type": t, "state": defaults[t]})
+    rooms = [{"name": f"Room {r}", "device_ids": [device_id(i) for i in range(r, n_devices, n_rooms)]}
+             for r in range(n_rooms)]
+    now = time.time()
+    actions = [{"seq": i + 1, "ts": now - n_log + i, "device": device_id(i % max(n_devices, 1)),
+                "action": "ON", "user": "bench"}
+               for i in range(n_log)]
+    models.configure_action_log(capacity=max(n_log, models.ACTION_LOG_CAPACITY))
+    models.restore({"devices": devices, "rooms": rooms, "actions": actions})
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # calentamiento
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1e6)
+    times.sort()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(max(s.count_diff, 0) for s in after.compare_to(before, "lineno"))
+
+    return {
+        "repeat": repeat,
+        "p50_us": round(_percentile(times, 50), 2),
+        "p95_us": round(_percentile(times, 95), 2),
+        "p99_us": round(_percentile(times, 99), 2),
+        "alloc_blocks": blocks,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+# ================================
+# CASES
+# ================================
+def model_cases(n: int) -> Dict[str, Callable[[], object]]:
+    rnd = random.Random(n)
+    ids = [device_id(i) for i in range(n)]
+
+    def set_state():
+        models.set_device_state(rnd.choice(ids), rnd.choice(["ON", "OFF"]), "bench")
+
+    def log_action():
+        models.log_action(rnd.choice(ids), "ON", "bench")
+
+    def recent_all():
+        models.get_recent_actions(limit=20)
+
+    def recent_device():
+        models.get_recent_actions(device_id=rnd.choice(ids), limit=10)
+
+    def create_colliding():
+        models.create_device("Device", "switch")
+
+    def assign_room():
+        did = rnd.choice(ids)
+        models.remove_device_from_room("Room 0", did)
+        models.assign_device_to_room("Room 0", did)
+
+    def of_type():
+        models.devices_of_type("slider")
+
+    return {
+        "set_device_state": set_state,
+        "log_action": log_action,
+        "get_recent_actions": recent_all,
+        "get_recent_actions[device]": recent_device,
+        "create_device[colliding id]": create_colliding,
+        "assign_device_to_room": assign_room,
+        "devices_of_type": of_type,
+    }
+
+
+def view_cases(n: int) -> Dict[str, Callable[[], object]]:
+    try:
+        from smart_home.app import SmartHomeApp
+        from smart_home.pages import details, overview, rooms, stats
+    except ImportError as ex:
+        print(f"skipping view builders: {ex}", file=sys.stderr)
+        return {}
+
+    def fresh_app():
+        return SmartHomeApp(FakePage())
+
+    def stats_view():
+        # stats.view registra un listener en el SAMPLER global: quitarlo en cada vuelta
+        app = fresh_app()
+        try:
+            return stats.view(app)
+        finally:
+            app.sampler.remove_listener(app)
+
+    return {
+        "overview.view": lambda: overview.view(fresh_app()),
+        "rooms.view": lambda: rooms.view(fresh_app()),
+        "stats.view": stats_view,
+        "details.view": lambda: details.view(fresh_app(), device_id(0)),
+    }
+
+
+def run(sizes: List[int], views: bool = True) -> Dict[str, Dict[str, float]]:
+    models.TICK = 0  # entrega sincrona: sin hilos de timer en las medidas
+    results = {}
+    for n in sizes:
+        repeat = max(5, min(500, 200_000 // max(n, 1)))
+        groups = [model_cases]
+        if views:
+            groups.append(view_cases)
+        for group in groups:
+            for name, fn in group(n).items():
+                populate(n, n)
+                key = f"{name} n={n}"
+                results[key] = measure(fn, repeat if group is model_cases else max(3, repeat // 10))
+                r = results[key]
+                print(f"{key:<42} p50 {r['p50_us']:>12.1f}us  p95 {r['p95_us']:>12.1f}us  "
+                      f"p99 {r['p99_us']:>12.1f}us  allocs {r['alloc_blocks']:>8}  peak {r['peak_kib']:>9.1f}KiB")
+    return results
+
+
+def compare(results, baseline, threshold: float) -> List[str]:
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base or not base.get("p50_us"):
+            continue
+        ratio = r["p50_us"] / base["p50_us"]
+        if ratio > threshold:
+            regressions.append(f"{key}: p50 {base['p50_us']}us -> {r['p50_us']}us (x{ratio:.2f})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--no-views", action="store_true", help="only benchmark the models layer")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed p50 slowdown ratio")
+    args = parser.parse_args()
+
+    results = run(args.sizes, views=not args.no_views)
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(results, json.load(fp), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
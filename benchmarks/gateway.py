@@ -0,0 +1,86 @@
+"""Throughput and tail latency of the device command path against the simulated gateway.
+
+    python -m benchmarks.gateway
+    python -m benchmarks.gateway --commands 20000 --latency 0.02 --jitter 0.01 --loss 0.01
+
+Every command goes through drivers.set_device_state(): optimistic model
+update, command queue, pooled and pipelined TCP connections to a local
+SimulatedGateway. Latency is measured from submit until the device confirms
+(or the change is rolled back).
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.bench import device_id, populate
+from smart_home import drivers, models
+from smart_home.simgateway import SimulatedGateway
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def run(args):
+    models.TICK = 0
+    populate(args.devices, 0)
+    queue = drivers.enable(workers=args.workers)
+    gateway = queue.call(SimulatedGateway(latency=args.latency, jitter=args.jitter, loss=args.loss,
+                                          reject=args.reject, seed=1).start())
+    driver = drivers.GatewayDriver(*gateway.address, pool_size=args.pool, pipeline=args.pipeline,
+                                   timeout=args.timeout, retries=args.retries)
+    drivers.set_driver(driver)
+
+    rnd = random.Random(args.devices)
+    latencies = []
+    results = {True: 0, False: 0}
+    done = threading.Event()
+    remaining = [args.commands]
+    lock = threading.Lock()
+
+    def on_done(started, future):
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            results[future.result()] += 1
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+
+    start = time.perf_counter()
+    for _ in range(args.commands):
+        started = time.perf_counter()
+        future = drivers.set_device_state(device_id(rnd.randrange(args.devices)),
+                                          rnd.choice(["ON", "OFF"]), "bench")
+        future.add_done_callback(lambda f, s=started: on_done(s, f))
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.commands} commands, {args.devices} devices, latency {args.latency * 1000:g}ms "
+          f"+/-{args.jitter * 1000:g}ms, loss {args.loss:.1%}, reject {args.reject:.1%}")
+    print(f"throughput {args.commands / elapsed:,.0f} commands/s  ({elapsed:.2f}s)")
+    print("latency    " + "  ".join(f"p{int(p * 100)} {percentile(latencies, p) * 1000:8.1f}ms"
+                                    for p in (0.5, 0.95, 0.99)))
+    print(f"confirmed {results[True]}  rolled back/failed {results[False]}  "
+          f"retries {driver.retried}  timeouts {driver.timeouts}")
+    print(f"queue {queue.stats()}")
+    print(f"gateway {gateway.stats()}")
+    queue.call(gateway.close())
+    drivers.disable()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=10_000)
+    parser.add_argument("--devices", type=int, default=1_000)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--reject", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=drivers.WORKERS)
+    parser.add_argument("--pool", type=int, default=drivers.POOL_SIZE)
+    parser.add_argument("--pipeline", type=int, default=drivers.PIPELINE_DEPTH)
+    parser.add_argument("--timeout", type=float, default=drivers.TIMEOUT)
+    parser.add_argument("--retries", type=int, default=drivers.RETRIES)
+    run(parser.parse_args())
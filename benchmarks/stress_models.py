@@ -0,0 +1,129 @@
+"""Hammer the models layer from many threads and check it stays consistent.
+
+    python -m benchmarks.stress_models [--threads 16] [--ops 2000]
+"""
+import argparse
+import random
+import sys
+import threading
+
+from smart_home import models, power
+
+
+def check_power() -> list:
+    """Mixed batches (state, assign, unassign, create, import) must leave the
+    incremental power totals equal to a full rebuild()."""
+    errors = []
+    model = power.PowerModel()
+    model.attach()
+    rnd = random.Random(0)
+    models.add_room("Power")
+    for i in range(200):
+        with models.batch():
+            ids = list(models.DEVICES)
+            did = rnd.choice(ids)
+            models.set_device_state(did, rnd.choice(["ON", "OFF"]))
+            if rnd.random() < 0.5:
+                models.remove_device_from_room("Power", did)
+            else:
+                models.assign_device_to_room("Power", did)
+            if i % 10 == 0:
+                models.create_device("power dev", "switch", "Power", "ON")
+            if i % 25 == 0:
+                models.import_bulk([{"name": "power imp", "type": "switch", "state": "ON", "room": "Power"}])
+        models.flush_changes()
+        incremental = (model.current(), model.room_totals())
+        model.rebuild()
+        if incremental != (model.current(), model.room_totals()):
+            errors.append(AssertionError(f"power totals drifted after batch {i}: {incremental[1]} "
+                                         f"!= {model.room_totals()}"))
+            break
+    model.detach()
+    return errors
+
+
+def run(threads: int = 16, ops: int = 2000) -> int:
+    models.TICK = 0
+    models.add_room("Stress")
+    errors = []
+    created = []
+    created_lock = threading.Lock()
+    start = threading.Barrier(threads + 2)
+    stop = threading.Event()
+
+    def writer(n):
+        rnd = random.Random(n)
+        start.wait()
+        try:
+            for i in range(ops):
+                op = rnd.random()
+                if op < 0.6:
+                    did = rnd.choice(list(models.DEVICES))
+                    models.set_device_state(did, rnd.choice(["ON", "OFF"]))
+                elif op < 0.8:
+                    with models.transaction():
+                        dev = models.create_device(f"dev {n}", "switch")
+                        models.assign_device_to_room("Stress", dev.id)
+                    with created_lock:
+                        created.append(dev.id)
+                elif op < 0.9:
+                    models.add_room(f"room {n} {i % 10}")
+                else:
+                    did = rnd.choice(list(models.DEVICES))
+                    models.remove_device_from_room("Stress", did)
+                    models.assign_device_to_room("Stress", did)
+        except Exception as ex:  # noqa: BLE001 - report every failure
+            errors.append(ex)
+
+    def reader():
+        start.wait()
+        try:
+            while not stop.is_set():
+                for d in models.all_devices():
+                    d.to_dict()
+                for r in models.get_rooms():
+                    list(r["device_ids"])
+                models.get_recent_actions(limit=50)
+                models.snapshot()
+        except Exception as ex:  # noqa: BLE001
+            errors.append(ex)
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in workers + readers:
+        t.start()
+    for t in workers:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+
+    # Comprobaciones de consistencia
+    if len(set(created)) != len(created):
+        errors.append(AssertionError("duplicate device ids were generated"))
+    missing = [did for did in created if did not in models.DEVICES]
+    if missing:
+        errors.append(AssertionError(f"{len(missing)} created devices are missing"))
+    stress = set(models.get_room("Stress")["device_ids"])
+    not_assigned = [did for did in created if did not in stress]
+    if not_assigned:
+        errors.append(AssertionError(f"{len(not_assigned)} devices lost their room"))
+    for did in stress:
+        if "Stress" not in models.rooms_of_device(did):
+            errors.append(AssertionError(f"reverse index out of sync for {did}"))
+            break
+
+    errors.extend(check_power())
+
+    for ex in errors[:10]:
+        print(f"ERROR: {ex!r}", file=sys.stderr)
+    print(f"{threads} threads x {ops} ops, {len(created)} devices created, {len(errors)} errors")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+    sys.exit(run(args.threads, args.ops))
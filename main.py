@@ -1,4 +1,8 @@
+import asyncio
+import os
+
 import flet as ft
+from smart_home import aio, api, clock, drivers, persistence
 from smart_home.app import SmartHomeApp
 
 
@@ -10,5 +14,28 @@ def main(page: ft.Page):
     app.build()
 
 
+async def main_async(page: ft.Page):
+    # Modo asyncio: la sesion corre en el event loop de Flet, y los timers de
+    # models, hub, coalescer y scheduler tambien (sin hilos propios)
+    clock.use_loop(asyncio.get_running_loop())
+    main(page)
+    await aio.update_page(page)
+
+
 if __name__ == "__main__":
-    ft.app(target=main)
+    persistence.open_store(os.environ.get("SMART_HOME_DB", "smart_home.db"))
+    async_mode = os.environ.get("SMART_HOME_ASYNC") == "1"
+    if async_mode:
+        # El muestreo pasa a ser una tarea asyncio en lugar de un hilo
+        SmartHomeApp.sampler = aio.AsyncSampler(history=SmartHomeApp.sampler.history)
+    if os.environ.get("SMART_HOME_GATEWAY"):
+        # Los cambios de estado salen hacia los devices (UI optimista)
+        drivers.connect(os.environ["SMART_HOME_GATEWAY"],
+                        latency=float(os.environ.get("SMART_HOME_GATEWAY_LATENCY", "0.02")),
+                        loss=float(os.environ.get("SMART_HOME_GATEWAY_LOSS", "0")))
+    if "SMART_HOME_SAMPLE_INTERVAL" in os.environ:
+        SmartHomeApp.sampler.interval = float(os.environ["SMART_HOME_SAMPLE_INTERVAL"])
+    if os.environ.get("SMART_HOME_API_PORT"):
+        # API HTTP/WebSocket en el mismo proceso que la UI
+        api.start(port=int(os.environ["SMART_HOME_API_PORT"]))
+    ft.app(target=main_async if async_mode else main)
@@ -0,0 +1,106 @@
+"""Asyncio flavour of the models API and of the background services.
+
+The model operations only touch memory under a short lock (the journal
+write happens on its own thread), so the async variants run them inline on
+the event loop instead of hopping to a worker thread. The timers of the
+other services move to the loop through clock.use_loop() (see main.py).
+"""
+import asyncio
+from typing import Any, List
+
+from smart_home import drivers, models
+from smart_home.sampler import Sampler
+
+
+# ================================
+# MODELS API (async)
+# ================================
+async def set_device_state(device_id: str, new_state: Any, user: str = "User"):
+    # Optimista: con la cola de comandos activa no se espera a la confirmacion
+    drivers.set_device_state(device_id, new_state, user)
+
+
+async def set_device_value(device_id: str, value: Any, user: str = "User"):
+    drivers.set_device_state(device_id, value, user)
+
+
+async def create_device(name: str, type: str, room_name: str = None, state: Any = None) -> models.Device:
+    return models.create_device(name, type, room_name, state)
+
+
+async def add_room(name: str):
+    models.add_room(name)
+
+
+async def assign_device_to_room(room_name: str, device_id: str):
+    models.assign_device_to_room(room_name, device_id)
+
+
+async def remove_device_from_room(room_name: str, device_id: str):
+    models.remove_device_from_room(room_name, device_id)
+
+
+async def get_recent_actions(device_id: str = None, limit: int = 10) -> List[Any]:
+    return models.get_recent_actions(device_id, limit)
+
+
+async def flush_journal(timeout: float = None) -> bool:
+    """Wait (without blocking the loop) until the journal has written everything queued."""
+    journal = models._journal
+    if journal is None:
+        return True
+    return await asyncio.to_thread(journal.flush, timeout)
+
+
+# ================================
+# PAGE UPDATES
+# ================================
+async def update_page(page):
+    """page.update_async() when this Flet version has it, page.update() otherwise."""
+    update_async = getattr(page, "update_async", None)
+    if update_async is not None:
+        await update_async()
+    else:
+        page.update()
+
+
+# ================================
+# SAMPLER como tarea asyncio
+# ================================
+class AsyncSampler(Sampler):
+    """Sampler running as an asyncio task on the app's event loop instead of a thread.
+
+    Listeners may be plain callables or coroutine functions.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, interval: float = None):
+        if interval is not None:
+            self.interval = interval
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run_async())
+
+    def stop(self, timeout: float = None):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def sample_async(self):
+        for key, result in self._notify(*self._record()):
+            try:
+                await result
+            except Exception:
+                self._drop(key)
+
+    async def _run_async(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.sample_async()
@@ -0,0 +1,597 @@
+"""Headless HTTP/JSON + WebSocket API over the models (no Flet needed).
+
+    python -m smart_home.api --port 8080
+    SMART_HOME_API_PORT=8080 python main.py     # alongside the Flet UI
+
+HTTP/1.1 with keep-alive. List endpoints send an ETag built from the model
+version counters and answer If-None-Match with 304, so polling is cheap.
+POST /batch runs several requests as one model batch. GET /ws upgrades to a
+WebSocket that streams every batch of model changes as a JSON message.
+
+    GET    /devices[?type=]                 GET  /rooms
+    POST   /devices                         POST /rooms
+    GET    /devices/<id>                    GET  /rooms/<name>
+    PUT    /devices/<id>/state[?wait=1]     POST /rooms/<name>/devices
+    POST   /devices/states                  DELETE /rooms/<name>/devices/<id>
+    POST   /import                          POST /rooms/<name>/off
+    GET    /export                          GET  /scenes
+    GET    /actions[?since&until&user&action&device&before&after&limit]
+    GET    /power                           PUT  /scenes/<name>
+    GET    /power/history[?window&max_points]   POST /scenes/<name>/activate
+    GET    /version                         POST /batch
+    GET    /ws[?device=&room=]
+"""
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from smart_home import bulk, drivers, models, persistence, power, scenes
+from smart_home.sampler import SAMPLER
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+MAX_BODY = 16 * 1024 * 1024
+ACTIONS_LIMIT = 100      # entradas por pagina en /actions
+CONFIRM_TIMEOUT = 5.0    # segundos para ?wait=1
+WS_QUEUE_SIZE = 1000     # lotes pendientes por cliente WebSocket
+WS_PING_INTERVAL = 30.0
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ================================
+# RUTAS
+# ================================
+# (metodo, regex, handler, version) ; handler(query, body, *grupos) -> (status, payload)
+ROUTES: List[Tuple[str, Any, Callable, Optional[Callable[[], str]]]] = []
+
+
+def route(method: str, pattern: str, version: Callable[[], str] = None):
+    def register(fn):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), fn, version))
+        return fn
+    return register
+
+
+def _devices_version() -> str:
+    return str(models.version("state", "device", "reset"))
+
+
+def _rooms_version() -> str:
+    return str(models.version("device", "room", "assign", "unassign", "reset"))
+
+
+def _log_version() -> str:
+    last = models.get_recent_actions(limit=1)
+    return f"{models.version('reset')}-{last[0].seq if last else 0}"
+
+
+def _mapping(value: Any, name: str) -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise ApiError(400, f"{name} must be a JSON object")
+    return value
+
+
+def _require(body: Dict[str, Any], *fields: str):
+    missing = [f for f in fields if f not in body]
+    if missing:
+        raise ApiError(400, f"missing field(s): {', '.join(missing)}")
+
+
+def _device(device_id: str) -> models.Device:
+    d = models.DEVICES.get(device_id)
+    if d is None:
+        raise ApiError(404, f"no device {device_id!r}")
+    return d
+
+
+def _check_type(type_: Any, name: str = "type"):
+    if type_ not in models.DEFAULT_STATES:
+        raise ApiError(400, f"{name} must be one of: {', '.join(models.DEFAULT_STATES)}")
+
+
+def _check_state(type_: str, state: Any, device_id: str = None, name: str = "state"):
+    """400 unless state is valid for the type (types without rules accept anything)."""
+    if type_ == "slider":
+        top = models.slider_max(device_id)
+        if isinstance(state, bool) or not isinstance(state, (int, float)) or not 0 <= state <= top:
+            raise ApiError(400, f"{name} must be a number between 0 and {top}")
+    elif type_ in models.VALID_STATES and state not in models.VALID_STATES[type_]:
+        raise ApiError(400, f"{name} must be one of: {', '.join(models.VALID_STATES[type_])}")
+
+
+def _room(name: str) -> Dict[str, Any]:
+    r = models.get_room(name)
+    if r is None:
+        raise ApiError(404, f"no room {name!r}")
+    return r
+
+
+# ---------- devices ----------
+@route("GET", "/devices", _devices_version)
+def list_devices(query, body):
+    devices = models.devices_of_type(query["type"]) if "type" in query else models.all_devices()
+    return 200, [d.to_dict() for d in devices]
+
+
+@route("POST", "/devices")
+def create_device(query, body):
+    _require(body, "name", "type")
+    _check_type(body["type"])
+    if body.get("state") is not None:
+        _check_state(body["type"], body["state"])
+    d = models.create_device(body["name"], body["type"], body.get("room"), body.get("state"))
+    return 201, d.to_dict()
+
+
+# El payload incluye las rooms del device: el ETag depende de ambas versiones
+@route("GET", "/devices/([^/]+)", lambda: f"{_devices_version()}-{_rooms_version()}")
+def get_device(query, body, device_id):
+    data = _device(device_id).to_dict()
+    data["rooms"] = models.rooms_of_device(device_id)
+    return 200, data
+
+
+@route("PUT", "/devices/([^/]+)/state")
+def set_state(query, body, device_id):
+    _require(body, "state")
+    d = _device(device_id)
+    _check_state(d.type, body["state"], device_id)
+    future = drivers.set_device_state(device_id, body["state"], body.get("user", "API"))
+    confirmed = None
+    if future is not None and query.get("wait") == "1":
+        try:
+            confirmed = future.result(CONFIRM_TIMEOUT)
+        except FutureTimeout:
+            pass
+    data = _device(device_id).to_dict()
+    data["confirmed"] = True if future is None else confirmed
+    return 200, data
+
+
+def _check_states(states: Dict[str, Any]):
+    # Ids desconocidos: apply_states los ignora
+    for device_id, state in states.items():
+        d = models.DEVICES.get(device_id)
+        if d is not None:
+            _check_state(d.type, state, device_id, f"states[{device_id!r}]")
+
+
+@route("POST", "/devices/states")
+def set_states(query, body):
+    _require(body, "states")
+    states = _mapping(body["states"], "states")
+    _check_states(states)
+    changed = drivers.apply_states(states, body.get("user", "API"), body.get("label"))
+    return 200, {"changed": changed}
+
+
+@route("POST", "/import")
+def import_devices(query, body):
+    for key, fields in (("devices", ("name", "type")), ("rooms", ("name",))):
+        items = body.get(key, [])
+        if not isinstance(items, list):
+            raise ApiError(400, f"{key} must be a list")
+        for i, item in enumerate(items):
+            _require(_mapping(item, f"{key}[{i}]"), *fields)
+            if key == "devices":
+                _check_type(item["type"], f"devices[{i}].type")
+                if item.get("state") is not None:
+                    _check_state(item["type"], item["state"], item.get("id"), f"devices[{i}].state")
+    created = bulk.import_data(body, body.get("user", "API"))
+    return 201, {"created": [d.id for d in created]}
+
+
+@route("GET", "/export", lambda: f"{_devices_version()}-{_rooms_version()}")
+def export_devices(query, body):
+    return 200, bulk.export_data()
+
+
+# ---------- rooms ----------
+@route("GET", "/rooms", _rooms_version)
+def list_rooms(query, body):
+    return 200, models.get_rooms()
+
+
+@route("POST", "/rooms")
+def add_room(query, body):
+    _require(body, "name")
+    models.add_room(body["name"])
+    return 201, _room(body["name"])
+
+
+@route("GET", "/rooms/([^/]+)", _rooms_version)
+def get_room(query, body, name):
+    return 200, _room(name)
+
+
+@route("POST", "/rooms/([^/]+)/devices")
+def assign_device(query, body, name):
+    _require(body, "device_id")
+    _room(name)
+    _device(body["device_id"])
+    models.assign_device_to_room(name, body["device_id"])
+    return 200, _room(name)
+
+
+@route("DELETE", "/rooms/([^/]+)/devices/([^/]+)")
+def unassign_device(query, body, name, device_id):
+    _room(name)
+    models.remove_device_from_room(name, device_id)
+    return 200, _room(name)
+
+
+@route("POST", "/rooms/([^/]+)/off")
+def room_off(query, body, name):
+    _room(name)
+    return 200, {"changed": scenes.room_off(name, body.get("user", "API"))}
+
+
+# ---------- scenes ----------
+@route("GET", "/scenes")
+def list_scenes(query, body):
+    return 200, scenes.SCENES
+
+
+@route("PUT", "/scenes/([^/]+)")
+def define_scene(query, body, name):
+    _require(body, "states")
+    states = _mapping(body["states"], "states")
+    _check_states(states)
+    scenes.define_scene(name, states)
+    return 200, {"name": name, "states": scenes.SCENES[name]}
+
+
+@route("POST", "/scenes/([^/]+)/activate")
+def activate_scene(query, body, name):
+    if name not in scenes.SCENES:
+        raise ApiError(404, f"no scene {name!r}")
+    return 200, {"changed": scenes.activate_scene(name, body.get("user", "API"))}
+
+
+# ---------- log, power ----------
+def _number(query, key: str, cast=float):
+    try:
+        return cast(query[key]) if key in query else None
+    except ValueError:
+        raise ApiError(400, f"{key} must be a number")
+
+
+@route("GET", "/actions", _log_version)
+def list_actions(query, body):
+    limit = _number(query, "limit", int)
+    if limit is None:
+        limit = ACTIONS_LIMIT
+    elif limit < 1:
+        raise ApiError(400, "limit must be at least 1")
+    entries = models.iter_actions(
+        since=_number(query, "since"), until=_number(query, "until"),
+        user=query.get("user"), action=query.get("action"), device_id=query.get("device"),
+        before=_number(query, "before", int), after=_number(query, "after", int),
+        newest_first=query.get("order", "desc") != "asc",
+    )
+    page = []
+    for entry in entries:
+        page.append(entry.to_dict())
+        if len(page) == limit:
+            break
+    # Cursor para la pagina siguiente (?before= o ?after= segun el orden)
+    return 200, {"actions": page, "next": page[-1]["seq"] if len(page) == limit else None}
+
+
+@route("GET", "/power")
+def get_power(query, body):
+    power._ensure_attached()
+    return 200, {"current": power.current(), "rooms": power.POWER.room_totals()}
+
+
+@route("GET", "/power/history")
+def power_history(query, body):
+    window = _number(query, "window") or 900
+    buckets = SAMPLER.history.query(time.time() - window, max_points=_number(query, "max_points", int))
+    return 200, [b._asdict() for b in buckets]
+
+
+@route("GET", "/version")
+def get_version(query, body):
+    return 200, {"version": models.version(), "devices": _devices_version(),
+                 "rooms": _rooms_version(), "actions": _log_version()}
+
+
+@route("POST", "/batch")
+def run_batch(query, body):
+    """[{"method", "path", "body"?}, ...] -> one result per request, one model batch."""
+    if not isinstance(body, list):
+        raise ApiError(400, "expected a list of requests")
+    for i, request in enumerate(body):
+        _mapping(request, f"request {i}")
+        if not isinstance(request.get("path"), str):
+            raise ApiError(400, f"request {i}: path must be a string")
+    results = []
+    with models.batch():
+        for request in body:
+            status, payload = dispatch(str(request.get("method", "GET")).upper(), request["path"],
+                                       request.get("body", {}))
+            results.append({"status": status, "body": payload})
+    return 200, results
+
+
+def dispatch(method: str, target: str, body: Any) -> Tuple[int, Any]:
+    parts = urlsplit(target)
+    query = dict(parse_qsl(parts.query))
+    try:
+        for m, pattern, fn, _ in ROUTES:
+            match = pattern.match(parts.path.rstrip("/") or "/")
+            if match and m == method:
+                if fn is not run_batch:
+                    _mapping(body, "request body")
+                return fn(query, body, *[unquote(g) for g in match.groups()])
+        raise ApiError(404, f"no route for {method} {parts.path}")
+    except ApiError as ex:
+        return ex.status, {"error": ex.message}
+    except Exception:
+        # Nunca cortar la conexion keep-alive sin respuesta
+        log.exception("error handling %s %s", method, target)
+        return 500, {"error": "internal server error"}
+
+
+# ================================
+# WEBSOCKET
+# ================================
+def _ws_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = bytes([0x80 | opcode, n])
+    elif n < 65536:
+        header = bytes([0x80 | opcode, 126]) + n.to_bytes(2, "big")
+    else:
+        header = bytes([0x80 | opcode, 127]) + n.to_bytes(8, "big")
+    return header + payload
+
+
+def _ws_read(rfile) -> Optional[Tuple[int, bytes]]:
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    n = head[1] & 0x7F
+    if n == 126:
+        n = int.from_bytes(rfile.read(2), "big")
+    elif n == 127:
+        n = int.from_bytes(rfile.read(8), "big")
+    mask = rfile.read(4) if head[1] & 0x80 else None
+    data = rfile.read(n)
+    if mask:
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return head[0] & 0x0F, data
+
+
+class _ChangeStream:
+    """One WebSocket client: model change batches in, JSON text frames out.
+
+    A client that falls WS_QUEUE_SIZE batches behind gets {"resync": true}
+    instead of the backlog and should fetch the state again.
+    """
+
+    STOP = None  # centinela: el cliente cerro, run() termina sin esperar al ping
+
+    def __init__(self, handler, device_id: str = None, room: str = None):
+        self.rfile = handler.rfile
+        self.wfile = handler.wfile
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(WS_QUEUE_SIZE)
+        self.closed = threading.Event()
+        self._send_lock = threading.Lock()
+        self._put_lock = threading.Lock()  # solo productores; run() consume sin lock
+        self._token = models.subscribe(self.on_change, device_id=device_id, room=room)
+
+    def on_change(self, changes):
+        message = {"version": models.version(), "changes": [c._asdict() for c in changes]}
+        with self._put_lock:
+            if self.closed.is_set():
+                return
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                self._drain()
+                self._put({"version": models.version(), "resync": True})
+
+    def _drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _put(self, message):
+        # Con _put_lock nadie mas llena la cola; aun asi, no fallar si esta llena
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                self._drain()
+
+    def stop(self):
+        """Stop streaming now: unsubscribe and wake run() up."""
+        models.unsubscribe(self._token)
+        with self._put_lock:
+            self.closed.set()
+            self._put(self.STOP)
+
+    def send(self, payload: bytes, opcode: int = 0x1):
+        with self._send_lock:
+            self.wfile.write(_ws_frame(payload, opcode))
+            self.wfile.flush()
+
+    def run(self):
+        threading.Thread(target=self._read_loop, name="ws-reader", daemon=True).start()
+        try:
+            self.send(json.dumps({"version": models.version(), "changes": []}).encode())
+            while not self.closed.is_set():
+                try:
+                    message = self.queue.get(timeout=WS_PING_INTERVAL)
+                except queue.Empty:
+                    self.send(b"", opcode=0x9)
+                    continue
+                if message is self.STOP:
+                    break
+                self.send(json.dumps(message, default=str).encode())
+        except OSError:
+            pass
+        finally:
+            self.stop()
+
+    def _read_loop(self):
+        try:
+            while True:
+                frame = _ws_read(self.rfile)
+                if frame is None or frame[0] == 0x8:
+                    break
+                if frame[0] == 0x9:
+                    self.send(frame[1], opcode=0xA)
+            self.send(b"", opcode=0x8)
+        except OSError:
+            pass
+        self.stop()
+
+
+# ================================
+# SERVIDOR HTTP
+# ================================
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    server_version = "SmartHomeAPI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/ws":
+            return self._websocket()
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, "request body too large")
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "invalid JSON body")
+
+    def _handle(self, method: str):
+        try:
+            body = self._read_body()
+        except ApiError as ex:
+            self.close_connection = True
+            return self._send_json(ex.status, {"error": ex.message})
+        etag = self._etag(method)
+        if etag is not None and etag in self.headers.get("If-None-Match", ""):
+            return self._send_json(304, None, etag)
+        status, payload = dispatch(method, self.path, body)
+        self._send_json(status, payload, etag if status == 200 else None)
+
+    def _etag(self, method: str) -> Optional[str]:
+        if method != "GET":
+            return None
+        path = urlsplit(self.path).path.rstrip("/")
+        for m, pattern, _, version in ROUTES:
+            if m == method and version is not None and pattern.match(path):
+                # Version antes de leer: como mucho el cliente vuelve a pedirlo
+                return f'W/"{version()}"'
+        return None
+
+    def _send_json(self, status: int, payload: Any, etag: str = None):
+        data = b"" if status == 304 else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key or self.headers.get("Upgrade", "").lower() != "websocket":
+            return self._send_json(400, {"error": "expected a WebSocket upgrade"})
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        _ChangeStream(self, query.get("device"), query.get("room")).run()
+        self.close_connection = True
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, verbose: bool = False):
+        super().__init__(address, ApiHandler)
+        self.verbose = verbose
+
+
+def start(host: str = "127.0.0.1", port: int = DEFAULT_PORT, verbose: bool = False) -> ApiServer:
+    """Serve the API from a background thread (e.g. next to the Flet UI)."""
+    server = ApiServer((host, port), verbose)
+    threading.Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SMART_HOME_API_PORT", DEFAULT_PORT)))
+    parser.add_argument("--db", default=os.environ.get("SMART_HOME_DB", "smart_home.db"))
+    parser.add_argument("--gateway", default=os.environ.get("SMART_HOME_GATEWAY"),
+                        help='"host:port" of a device gateway, or "sim"')
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    persistence.open_store(args.db)
+    if args.gateway:
+        drivers.connect(args.gateway)
+    SAMPLER.start()
+    server = ApiServer((args.host, args.port), args.verbose)
+    print(f"Smart Home API on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
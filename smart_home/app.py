@@ -1,15 +1,39 @@
 import flet as ft
 from smart_home import models
-from smart_home.pages import overview, stats, details
+from smart_home.dialogs import DialogManager
+from smart_home.sampler import SAMPLER
+from smart_home.scheduler import UpdateScheduler
+from smart_home.sessions import HUB
+from smart_home.viewcache import ViewCache
+from smart_home.pages import overview, stats, details, rooms
 
 
 class SmartHomeApp:
+    # Servicio compartido por todas las sesiones
+    sampler = SAMPLER
+
     def __init__(self, page: ft.Page):
         self.page = page
-        self.content = ft.Container()
+        self.content = ft.Container(expand=True)
+        # Todas las paginas piden updates aqui; se envia como mucho uno por frame
+        self.updates = UpdateScheduler(page)
+        self.dialogs = DialogManager(page)
+        # Vistas ya construidas por ruta; se reutilizan mientras su sello no cambie
+        self.views = ViewCache()
+
+    def request_update(self):
+        self.updates.request()
+
+    def flush_updates(self):
+        """Escape hatch: push the pending update right now."""
+        self.updates.flush_now()
 
     def build(self):
         self.page.on_route_change = self.on_route_change
+        # Todas las sesiones reciben los deltas del modelo, agrupados por frame
+        HUB.register(self)
+        self.page.on_close = self.on_close
+        self.sampler.start()
         self.page.go("/")
         self.page.appbar = ft.AppBar(
             title=ft.Text("Smart Home Controller"),
@@ -25,8 +49,15 @@ class SmartHomeApp:
         if not self.page.route:
             self.page.go("/")
 
+    def on_close(self, e=None):
+        HUB.unregister(self)
+        self.sampler.remove_listener(self)
+
     def on_route_change(self, route):
         r = self.page.route
+        if r != "/stats":
+            # Nadie mira el grafico en esta sesion: no enviarle muestras
+            self.sampler.remove_listener(self)
         # simple routing
         if r == "/" or r == "":
             self.show_overview()
@@ -39,19 +70,62 @@ class SmartHomeApp:
             did = r.split("/device/", 1)[1]
             self.show_device_details(did)
 
+    def on_models_change(self, changes):
+        if any(c.kind == "reset" for c in changes):
+            # Estado restaurado: ninguna vista guardada sirve
+            self.views.clear()
+            return self.on_route_change(None)
+        # Solo la pagina visible reacciona; las demas se reconstruyen al volver
+        # si su sello de version ha cambiado
+        r = self.page.route or "/"
+        if r == "/":
+            overview.on_change(self, changes)
+        elif r == "/stats":
+            stats.on_change(self, changes)
+        elif r == "/rooms":
+            rooms.on_change(self, changes)
+        elif r.startswith("/device/"):
+            did = r.split("/device/", 1)[1]
+            if any(c.device_id == did for c in changes):
+                self.show_device_details(did)
+            return
+        # La vista visible se ha parcheado en su sitio: sigue valida
+        self.views.restamp(r, self._stamp(r))
+
+    def _stamp(self, route: str):
+        """Version of the model data a route's view depends on."""
+        if route == "/stats":
+            # El grafico y el log se ponen al dia en stats.resume()
+            return models.version("reset")
+        if route == "/rooms":
+            return models.version("device", "room", "assign", "unassign", "reset")
+        if route.startswith("/device/"):
+            did = route.split("/device/", 1)[1]
+            last = models.get_recent_actions(device_id=did, limit=1)
+            d = models.DEVICES.get(did)
+            # El estado tambien: las escenas lo cambian sin log por device
+            return models.version("reset"), last[0].seq if last else None, d and d.state
+        return models.version("state", "device", "reset")
+
+    def _show(self, route: str, build) -> bool:
+        """Show the cached view for route (building it if stale); True on a cache hit."""
+        hits = self.views.hits
+        self.content.content = self.views.get(route, self._stamp(route), build)
+        return self.views.hits > hits
+
     def show_overview(self):
-        self.content.content = overview.view(self)
-        self.page.update()
+        self._show("/", lambda: overview.view(self))
+        self.flush_updates()
 
     def show_stats(self):
-        self.content.content = stats.view(self)
-        self.page.update()
+        if self._show("/stats", lambda: stats.view(self)):
+            stats.resume(self)
+        self.flush_updates()
 
     def show_device_details(self, device_id: str):
-        self.content.content = details.view(self, device_id)
-        self.page.update()
-        
+        self._show(f"/device/{device_id}", lambda: details.view(self, device_id))
+        self.flush_updates()
+
     def show_rooms(self):
-        import smart_home.pages.rooms as rooms
-        self.content.content = rooms.view(self)
-        self.page.update()
\ No newline at end of file
+        self._show("/rooms", lambda: rooms.view(self))
+        self.flush_updates()
\ No newline at end of file
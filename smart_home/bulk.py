@@ -0,0 +1,144 @@
+"""Bulk import/export of devices, rooms and assignments (JSON or CSV),
+plus streaming export of the action log (NDJSON or CSV).
+
+JSON: {"devices": [{"id"?, "name", "type", "state"?, "room"?}, ...],
+       "rooms": [{"name", "device_ids"?: [...]}, ...]}
+CSV:  one device per row with columns name,type[,state][,room][,id]; a device
+      in several rooms is written with the room names joined by ";".
+"""
+import csv
+import json
+from typing import Any, Dict, IO, List, Union
+
+from smart_home import models
+
+PathOrFile = Union[str, IO[str]]
+CSV_FIELDS = ["id", "name", "type", "state", "room"]
+ROOM_SEPARATOR = ";"
+
+
+def _open(target: PathOrFile, mode: str):
+    if isinstance(target, str):
+        return open(target, mode, newline="", encoding="utf-8")
+    return _Borrowed(target)
+
+
+class _Borrowed:
+    """Context manager for a file object we must not close."""
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def __enter__(self):
+        return self.fp
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _parse_state(value: str) -> Any:
+    # "22.5" -> 22.5, "3" -> 3, "ON" -> "ON", "" -> None (estado por defecto)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+# ================================
+# IMPORT
+# ================================
+def import_data(data: Dict[str, Any], user: str = "User") -> List[models.Device]:
+    return models.import_bulk(data.get("devices", []), data.get("rooms", []), user)
+
+
+def import_json(source: PathOrFile, user: str = "User") -> List[models.Device]:
+    with _open(source, "r") as fp:
+        return import_data(json.load(fp), user)
+
+
+def import_csv(source: PathOrFile, user: str = "User") -> List[models.Device]:
+    devices = []
+    with _open(source, "r") as fp:
+        for row in csv.DictReader(fp):
+            rooms = [r.strip() for r in (row.get("room") or "").split(ROOM_SEPARATOR) if r.strip()]
+            devices.append({
+                "id": row.get("id") or None,
+                "name": row["name"],
+                "type": row["type"],
+                "state": _parse_state(row.get("state")),
+                "room": rooms,
+            })
+    return models.import_bulk(devices, user=user)
+
+
+# ================================
+# EXPORT
+# ================================
+def export_data() -> Dict[str, Any]:
+    snap = models.snapshot()
+    return {"devices": snap["devices"], "rooms": snap["rooms"]}
+
+
+def export_json(target: PathOrFile):
+    with _open(target, "w") as fp:
+        json.dump(export_data(), fp, indent=2)
+
+
+def export_csv(target: PathOrFile):
+    devices = models.all_devices()  # instantanea consistente
+    with _open(target, "w") as fp:
+        writer = csv.DictWriter(fp, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for d in devices:
+            writer.writerow({
+                "id": d.id,
+                "name": d.name,
+                "type": d.type,
+                "state": d.state,
+                "room": ROOM_SEPARATOR.join(models.rooms_of_device(d.id)),
+            })
+
+
+# ================================
+# ACTION LOG (streaming, memoria constante)
+# ================================
+ACTION_FIELDS = ["seq", "ts", "time", "device", "action", "user"]
+
+
+def _action_row(entry: models.ActionEntry) -> Dict[str, Any]:
+    row = entry.to_dict()
+    row["time"] = models.format_time(entry.ts)
+    return row
+
+
+def export_actions_ndjson(target: PathOrFile, **filters) -> int:
+    """Write matching log entries (oldest first) as one JSON object per line.
+
+    filters are passed to models.iter_actions(); returns the number of entries.
+    """
+    filters.setdefault("newest_first", False)
+    count = 0
+    with _open(target, "w") as fp:
+        for entry in models.iter_actions(**filters):
+            fp.write(json.dumps(_action_row(entry)))
+            fp.write("\n")
+            count += 1
+    return count
+
+
+def export_actions_csv(target: PathOrFile, **filters) -> int:
+    filters.setdefault("newest_first", False)
+    count = 0
+    with _open(target, "w") as fp:
+        writer = csv.DictWriter(fp, fieldnames=ACTION_FIELDS)
+        writer.writeheader()
+        for entry in models.iter_actions(**filters):
+            writer.writerow(_action_row(entry))
+            count += 1
+    return count
@@ -0,0 +1,117 @@
+from typing import List, Sequence, Tuple
+
+import flet as ft
+
+Point = Tuple[float, float]
+
+
+# ================================
+# DOWNSAMPLING
+# ================================
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the shape."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Media del bucket siguiente
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(p[0] for p in points[start:end]) / (end - start)
+        avg_y = sum(p[1] for p in points[start:end]) / (end - start)
+
+        # Punto del bucket actual con el triangulo mas grande
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+
+# ================================
+# GRAFICO
+# ================================
+class PowerChart:
+    """One LineChart control for the power history.
+
+    set_points() downsamples to the chart width (one point every `px_per_point`
+    pixels); append() adds a sample in place with a running max, re-downsampling
+    only when the series grows past twice its budget.
+    """
+
+    def __init__(self, width: int = 800, height: int = 180, px_per_point: int = 2):
+        self.max_points = max(3, width // px_per_point)
+        self.window = None
+        self.max_y = 0.0
+        self._points: List[Point] = []
+        self._series = ft.LineChartData(
+            data_points=[],
+            stroke_width=2,
+            color=ft.Colors.BLUE_300,
+            below_line_bgcolor=ft.Colors.BLUE_50,
+        )
+        self.control = ft.LineChart(
+            data_series=[self._series],
+            min_y=0,
+            max_y=1,
+            height=height,
+            expand=True,
+            left_axis=ft.ChartAxis(labels_size=40),
+            bottom_axis=ft.ChartAxis(show_labels=False),
+        )
+
+    def set_points(self, points: Sequence[Point], window: float = None):
+        """Replace the whole series (e.g. when the time window changes)."""
+        self.window = window
+        self._points = lttb(points, self.max_points)
+        self.max_y = max((p[1] for p in self._points), default=0.0)
+        self._sync()
+
+    def append(self, x: float, y: float):
+        self._points.append((x, y))
+        if y > self.max_y:
+            self.max_y = y
+        if self.window is not None:
+            # Ventana deslizante: descartar lo que sale por la izquierda
+            left = x - self.window
+            drop = 0
+            while drop < len(self._points) and self._points[drop][0] < left:
+                drop += 1
+            if drop:
+                dropped = self._points[:drop]
+                del self._points[:drop]
+                if any(p[1] >= self.max_y for p in dropped):
+                    self.max_y = max((p[1] for p in self._points), default=0.0)
+        if len(self._points) > 2 * self.max_points:
+            self._points = lttb(self._points, self.max_points)
+            self._sync()
+            return
+        self._series.data_points.append(ft.LineChartDataPoint(x, y))
+        if len(self._series.data_points) > len(self._points):
+            del self._series.data_points[:len(self._series.data_points) - len(self._points)]
+        self._sync_axes()
+
+    def __len__(self):
+        return len(self._points)
+
+    def _sync(self):
+        self._series.data_points = [ft.LineChartDataPoint(x, y) for x, y in self._points]
+        self._sync_axes()
+
+    def _sync_axes(self):
+        self.control.max_y = self.max_y * 1.1 if self.max_y else 1
+        if self._points:
+            self.control.min_x = self._points[0][0]
+            self.control.max_x = self._points[-1][0]
@@ -0,0 +1,93 @@
+"""Where the background services run their delayed callbacks.
+
+By default every call_later() is a daemon threading.Timer. In asyncio mode
+(use_loop() called with Flet's event loop) the same callbacks are scheduled
+on that loop instead, so the models tick, the session hub, the write
+coalescer and the update scheduler stop creating OS threads. Both kinds of
+handle can be cancelled from any thread.
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Optional
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def use_loop(loop: Optional[asyncio.AbstractEventLoop]):
+    """Run later callbacks on loop (None: back to threads)."""
+    global _loop
+    _loop = loop
+
+
+def loop() -> Optional[asyncio.AbstractEventLoop]:
+    return _loop
+
+
+def _on(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class _LoopTimer:
+    """threading.Timer look-alike backed by loop.call_later()."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, delay: float, fn: Callable, args):
+        self._loop = loop
+        self._fn = fn
+        self._args = args
+        self._handle = None
+        self.cancelled = False
+        if _on(loop):
+            self._arm(delay)
+        else:
+            loop.call_soon_threadsafe(self._arm, delay)
+
+    def _arm(self, delay: float):
+        if not self.cancelled:
+            self._handle = self._loop.call_later(delay, self._fire)
+
+    def _fire(self):
+        if not self.cancelled:
+            self._fn(*self._args)
+
+    def cancel(self):
+        # _fire comprueba el flag: basta con marcarlo desde cualquier hilo
+        self.cancelled = True
+        if self._handle is not None and _on(self._loop):
+            self._handle.cancel()
+
+
+def call_later(delay: float, fn: Callable, *args: Any):
+    """Call fn(*args) after delay seconds; returns a handle with cancel()."""
+    loop = _loop
+    if loop is not None:
+        return _LoopTimer(loop, delay, fn, args)
+    timer = threading.Timer(delay, fn, args)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def call_soon(fn: Callable, *args: Any) -> bool:
+    """Run fn(*args) on the loop in asyncio mode; False (nothing done) otherwise."""
+    loop = _loop
+    if loop is None:
+        return False
+    loop.call_soon_threadsafe(fn, *args)
+    return True
+
+
+def spawn(coro) -> bool:
+    """Run a coroutine on the loop from any thread; False (not run) without a loop."""
+    loop = _loop
+    if loop is None:
+        coro.close()
+        return False
+    if _on(loop):
+        loop.create_task(coro)
+    else:
+        asyncio.run_coroutine_threadsafe(coro, loop)
+    return True
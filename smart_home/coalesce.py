@@ -0,0 +1,72 @@
+import threading
+from typing import Any, Callable, Dict
+
+from smart_home import clock, drivers, models
+
+
+# ================================
+# CONFIG: ventana de coalescencia por tipo de device (segundos)
+# ================================
+COMMIT_DELAY: Dict[str, float] = {
+    "slider": 0.4,
+}
+DEFAULT_DELAY = 0.3
+
+
+class WriteCoalescer:
+    """Collapse bursts of writes to the same device into a single committed write.
+
+    push() only remembers the latest value and restarts the quiet-period timer;
+    the model (and the action log) see the value once, when the timer fires or
+    when flush() is called (e.g. on the slider's change-end event).
+    """
+
+    def __init__(self, commit: Callable[[str, Any], None] = None, delays: Dict[str, float] = None):
+        self._commit = commit or drivers.set_device_state
+        self.delays = delays if delays is not None else COMMIT_DELAY
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._callbacks: Dict[str, Callable[[], None]] = {}
+        self._timers: Dict[str, Any] = {}   # handles de clock.call_later
+
+    def delay_for(self, device_id: str) -> float:
+        d = models.DEVICES.get(device_id)
+        return self.delays.get(d.type if d else None, DEFAULT_DELAY)
+
+    def push(self, device_id: str, value: Any, on_commit: Callable[[], None] = None):
+        """Remember value as the pending write for device_id and (re)arm its timer."""
+        with self._lock:
+            self._pending[device_id] = value
+            if on_commit is not None:
+                self._callbacks[device_id] = on_commit
+            timer = self._timers.pop(device_id, None)
+            if timer:
+                timer.cancel()
+            delay = self.delay_for(device_id)
+            if delay > 0:
+                self._timers[device_id] = clock.call_later(delay, self.flush, device_id)
+        if delay <= 0:
+            self.flush(device_id)
+
+    def pending(self, device_id: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._pending.get(device_id, default)
+
+    def flush(self, device_id: str = None):
+        """Commit the pending value of one device (or of all of them) right now."""
+        with self._lock:
+            ids = [device_id] if device_id is not None else list(self._pending)
+            work = []
+            for did in ids:
+                timer = self._timers.pop(did, None)
+                if timer:
+                    timer.cancel()
+                if did in self._pending:
+                    work.append((did, self._pending.pop(did), self._callbacks.pop(did, None)))
+        for did, value, callback in work:
+            self._commit(did, value)
+            if callback:
+                callback()
+
+
+COALESCER = WriteCoalescer()
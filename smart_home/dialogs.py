@@ -0,0 +1,54 @@
+from typing import Callable, Dict
+
+import flet as ft
+
+
+class DialogManager:
+    """One reusable AlertDialog per kind and page.
+
+    The first get() of a kind builds the dialog and adds it to page.overlay;
+    later calls return the same instance, which the caller refills with new
+    content. Closed dialogs in the overlay that the manager does not own
+    (left behind by older code) are evicted whenever a dialog is shown.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._dialogs: Dict[str, ft.AlertDialog] = {}
+        self.evicted = 0
+
+    def get(self, kind: str, build: Callable[[], ft.AlertDialog]) -> ft.AlertDialog:
+        dialog = self._dialogs.get(kind)
+        if dialog is None:
+            dialog = self._dialogs[kind] = build()
+            self.page.overlay.append(dialog)
+        return dialog
+
+    def show(self, kind: str, build: Callable[[], ft.AlertDialog]) -> ft.AlertDialog:
+        self.evict_stale()
+        dialog = self.get(kind, build)
+        dialog.open = True
+        return dialog
+
+    def close(self, kind: str):
+        dialog = self._dialogs.get(kind)
+        if dialog is not None:
+            dialog.open = False
+
+    def evict_stale(self) -> int:
+        """Drop closed dialogs from the overlay that are not managed here."""
+        owned = {id(d) for d in self._dialogs.values()}
+        keep = [c for c in self.page.overlay
+                if not isinstance(c, ft.AlertDialog) or id(c) in owned or getattr(c, "open", False)]
+        removed = len(self.page.overlay) - len(keep)
+        if removed:
+            self.page.overlay[:] = keep
+            self.evicted += removed
+        return removed
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self.page.overlay)
+
+    def stats(self) -> Dict[str, int]:
+        return {"dialogs": len(self._dialogs), "overlay_size": self.overlay_size, "evicted": self.evicted}
@@ -0,0 +1,405 @@
+"""Device drivers: how state changes reach the hardware.
+
+set_device_state() / apply_states() are what the pages call. Without a
+command queue they only update the models, as before. Once enable() has
+started a CommandQueue, the change is applied to the models right away
+(optimistic UI) and sent to the device's driver in the background; the
+driver's answer confirms it, and a failure after all retries rolls the
+device back to its last confirmed state.
+"""
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from smart_home import models
+
+
+WORKERS = 64          # comandos en vuelo a la vez (todas las gateways)
+POOL_SIZE = 4         # conexiones por gateway
+PIPELINE_DEPTH = 32   # peticiones sin respuesta por conexion
+TIMEOUT = 1.0         # segundos por intento
+RETRIES = 3
+BACKOFF = 0.05        # segundos, se dobla en cada reintento
+ROLLBACK_USER = "gateway"
+
+
+class DriverError(Exception):
+    """The device rejected the command or never answered it."""
+
+
+# ================================
+# DRIVERS
+# ================================
+class DeviceDriver(ABC):
+    """Base driver: send() returns the state the device reports after the command."""
+
+    @abstractmethod
+    async def send(self, device_id: str, state: Any) -> Any:
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryDriver(DeviceDriver):
+    """No hardware behind it: every command succeeds immediately."""
+
+    async def send(self, device_id: str, state: Any) -> Any:
+        return state
+
+
+class _Connection:
+    """One TCP connection carrying many pipelined requests, matched by id."""
+
+    def __init__(self, reader, writer, depth: int):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._slots = asyncio.Semaphore(depth)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    async def request(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        async with self._slots:
+            rid = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[rid] = future
+            try:
+                # No se espera la respuesta anterior para enviar la siguiente
+                self.writer.write(json.dumps({"id": rid, **message}).encode() + b"\n")
+                await self.writer.drain()
+                return await asyncio.wait_for(future, timeout)
+            finally:
+                self._pending.pop(rid, None)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.get(reply.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("gateway connection closed"))
+
+    async def close(self):
+        self.closed = True
+        self._reader_task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+
+
+class GatewayDriver(DeviceDriver):
+    """Driver for a gateway speaking newline-delimited JSON over TCP.
+
+    Request {"id", "device", "state"}; reply {"id", "ok": true, "state"} or
+    {"id", "ok": false, "error"}. Up to pool_size connections are opened on
+    demand, each with up to `pipeline` requests in flight. Timeouts and lost
+    connections are retried with exponential backoff; a rejection is not.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int = POOL_SIZE, pipeline: int = PIPELINE_DEPTH,
+                 timeout: float = TIMEOUT, retries: int = RETRIES, backoff: float = BACKOFF):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.pipeline = pipeline
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pool: List[_Connection] = []
+        self._connect_lock = asyncio.Lock()
+        self.retried = 0
+        self.timeouts = 0
+
+    async def _connection(self) -> _Connection:
+        self._pool = [c for c in self._pool if not c.closed]
+        best = min(self._pool, key=lambda c: c.load, default=None)
+        if best is not None and (best.load == 0 or len(self._pool) >= self.pool_size):
+            return best
+        async with self._connect_lock:
+            if len(self._pool) < self.pool_size:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout)
+                self._pool.append(_Connection(reader, writer, self.pipeline))
+        return min(self._pool, key=lambda c: c.load)
+
+    async def send(self, device_id: str, state: Any) -> Any:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                conn = await self._connection()
+                reply = await conn.request({"device": device_id, "state": state}, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                continue
+            except OSError:
+                continue
+            if not reply.get("ok"):
+                raise DriverError(f"{device_id}: {reply.get('error', 'rejected')}")
+            return reply.get("state", state)
+        raise DriverError(f"{device_id}: no answer after {self.retries + 1} attempts")
+
+    async def close(self):
+        pool, self._pool = self._pool, []
+        for conn in pool:
+            await conn.close()
+
+
+# Driver por device id, por tipo, o el de por defecto
+_default_driver: DeviceDriver = MemoryDriver()
+_type_drivers: Dict[str, DeviceDriver] = {}
+_device_drivers: Dict[str, DeviceDriver] = {}
+
+
+def set_driver(driver: DeviceDriver, *device_ids: str, type: str = None):
+    """Route the given devices (or a device type, or everything else) to driver."""
+    global _default_driver
+    if device_ids:
+        for did in device_ids:
+            _device_drivers[did] = driver
+    elif type is not None:
+        _type_drivers[type] = driver
+    else:
+        _default_driver = driver
+
+
+def driver_for(device_id: str) -> DeviceDriver:
+    driver = _device_drivers.get(device_id)
+    if driver is not None:
+        return driver
+    d = models.DEVICES.get(device_id)
+    return _type_drivers.get(d.type if d else None, _default_driver)
+
+
+def _all_drivers() -> List[DeviceDriver]:
+    drivers = [_default_driver, *_type_drivers.values(), *_device_drivers.values()]
+    return list({id(d): d for d in drivers}.values())
+
+
+# ================================
+# COLA DE COMANDOS
+# ================================
+class CommandQueue:
+    """Sends state changes to the drivers from a background event loop.
+
+    submit() is thread-safe. Commands to the same device go out one at a
+    time and in order; while one is in flight, newer ones for that device
+    collapse into the latest state. The returned future resolves to True
+    once the device confirms, False if the change was rolled back.
+    """
+
+    def __init__(self, workers: int = WORKERS):
+        self.workers = workers
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = None
+        self._queue: Optional[asyncio.Queue] = None
+        # Solo se tocan desde el hilo del loop
+        self._wanted: Dict[str, Tuple[Any, List[Future]]] = {}
+        self._confirmed: Dict[str, Any] = {}
+        self._sending = set()
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.rolled_back = 0
+        self.coalesced = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="device-commands", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.Queue()
+        tasks = [self.loop.create_task(self._worker()) for _ in range(self.workers)]
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def call(self, coro, timeout: float = None):
+        """Run a coroutine on the queue's loop from another thread and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self, timeout: float = None):
+        if self.running:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, device_id: str, state: Any, user: str = "User") -> Future:
+        """Apply state to the models now and send it to the device in the background."""
+        future = Future()
+        d = models.DEVICES.get(device_id)
+        if d is None:
+            future.set_result(False)
+            return future
+        previous = d.state
+        models.set_device_state(device_id, state, user)
+        self.loop.call_soon_threadsafe(self._enqueue, device_id, state, previous, future)
+        return future
+
+    def submit_many(self, states: Dict[str, Any], user: str = "User", label: str = None) -> Dict[str, Future]:
+        """models.apply_states() now, then one command per device that changed."""
+        devices = models.DEVICES
+        previous = {did: devices[did].state for did in states if did in devices}
+        futures = {}
+        for did in models.apply_states(states, user, label):
+            future = futures[did] = Future()
+            self.loop.call_soon_threadsafe(self._enqueue, did, states[did], previous[did], future)
+        return futures
+
+    def _enqueue(self, device_id: str, state: Any, previous: Any, future: Future):
+        self._confirmed.setdefault(device_id, previous)
+        wanted = self._wanted.get(device_id)
+        if wanted is not None:
+            # Todavia sin enviar: solo cuenta el ultimo estado pedido
+            self.coalesced += 1
+            wanted[1].append(future)
+            self._wanted[device_id] = (state, wanted[1])
+            return
+        self._wanted[device_id] = (state, [future])
+        if device_id not in self._sending:
+            self._queue.put_nowait(device_id)
+
+    async def _worker(self):
+        while True:
+            device_id = await self._queue.get()
+            state, futures = self._wanted.pop(device_id)
+            self._sending.add(device_id)
+            self.sent += 1
+            try:
+                reported = await driver_for(device_id).send(device_id, state)
+                ok = True
+            except Exception:
+                ok = False
+            self._sending.discard(device_id)
+            superseded = device_id in self._wanted
+            if ok:
+                self.confirmed += 1
+                self._confirmed[device_id] = reported
+                if reported != state and not superseded:
+                    # El device no hizo exactamente lo pedido: mostrar lo real
+                    models.set_device_state(device_id, reported, ROLLBACK_USER)
+            else:
+                self.failed += 1
+                if not superseded:
+                    self._rollback(device_id, state)
+            if superseded:
+                self._queue.put_nowait(device_id)
+            for future in futures:
+                future.set_result(ok)
+
+    def _rollback(self, device_id: str, state: Any):
+        previous = self._confirmed.get(device_id)
+        d = models.DEVICES.get(device_id)
+        if d is not None and d.state == state and previous != state:
+            models.set_device_state(device_id, previous, ROLLBACK_USER)
+            self.rolled_back += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._wanted) + len(self._sending)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "rolled_back": self.rolled_back,
+            "coalesced": self.coalesced,
+            "pending": self.pending,
+        }
+
+
+QUEUE: Optional[CommandQueue] = None
+
+
+def enable(driver: DeviceDriver = None, workers: int = WORKERS) -> CommandQueue:
+    """Start the shared command queue (once); driver becomes the default driver."""
+    global QUEUE
+    if driver is not None:
+        set_driver(driver)
+    if QUEUE is None:
+        QUEUE = CommandQueue(workers)
+        QUEUE.start()
+    return QUEUE
+
+
+def disable(timeout: float = None):
+    global QUEUE
+    queue, QUEUE = QUEUE, None
+    if queue is not None:
+        for driver in _all_drivers():
+            queue.call(driver.close(), timeout)
+        queue.stop(timeout)
+
+
+def connect(spec: str, **simulated) -> GatewayDriver:
+    """Start the queue and route every device to a gateway.
+
+    spec is "host:port", or "sim" for a local SimulatedGateway (created with
+    the given keyword arguments) running on the queue's loop.
+    """
+    queue = enable()
+    if spec == "sim":
+        from smart_home.simgateway import SimulatedGateway
+        host, port = queue.call(SimulatedGateway(**simulated).start()).address
+    else:
+        host, port = spec.rsplit(":", 1)
+    driver = GatewayDriver(host, int(port))
+    set_driver(driver)
+    return driver
+
+
+# ================================
+# API PARA LAS PAGINAS
+# ================================
+def set_device_state(device_id: str, state: Any, user: str = "User") -> Optional[Future]:
+    """Change a device: optimistic and queued to its driver when the queue is running."""
+    queue = QUEUE
+    if queue is None:
+        models.set_device_state(device_id, state, user)
+        return None
+    return queue.submit(device_id, state, user)
+
+
+def apply_states(states: Dict[str, Any], user: str = "User", label: str = None) -> List[str]:
+    """models.apply_states() that also reaches the hardware; returns the changed ids."""
+    queue = QUEUE
+    if queue is None:
+        return models.apply_states(states, user, label)
+    return list(queue.submit_many(states, user, label))
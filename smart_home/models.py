@@ -1,8 +1,19 @@
+import logging
+import threading
+from contextlib import contextmanager
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, NamedTuple, Optional, Callable, Iterator
+
+from smart_home import clock
+
+log = logging.getLogger(__name__)
 
 
 class Device:
+    # Sin __dict__ por instancia: ~3x menos memoria con 100k devices
+    __slots__ = ("id", "name", "type", "state")
+
     def __init__(self, id: str, name: str, type: str, state: Any = None):
         self.id = id
         self.name = name
@@ -24,27 +35,362 @@ DEVICES: Dict[str, Device] = {
 }
 
 
+def _index_by_type(devices: Dict[str, Device]) -> Dict[str, Dict[str, Device]]:
+    by_type: Dict[str, Dict[str, Device]] = {}
+    for d in devices.values():
+        by_type.setdefault(d.type, {})[d.id] = d
+    return by_type
+
+
+# Indice por tipo (crece en sitio, igual que DEVICES)
+_BY_TYPE = _index_by_type(DEVICES)
+
+
+def devices_of_type(*types: str) -> List[Device]:
+    """Devices of the given types, without scanning DEVICES."""
+    by_type = _BY_TYPE
+    if len(types) == 1:
+        return list(by_type.get(types[0], {}).values())
+    return [d for t in types for d in by_type.get(t, {}).values()]
+
+
+def all_devices() -> List[Device]:
+    """Snapshot list of every device; iterate this, not DEVICES, from other threads."""
+    # list() de un dict con claves str no suelta el GIL: copia atomica
+    return list(DEVICES.values())
+
+
+def device_types() -> List[str]:
+    return list(_BY_TYPE)
+
+
+def count_of_type(type: str) -> int:
+    return len(_BY_TYPE.get(type, ()))
+
+
+# ================================
+# CONCURRENCIA
+# ================================
+# Un unico lock para escritores. Los lectores no lo necesitan: las estructuras
+# de ROOMS se reemplazan (copy-on-write) en lugar de mutarse. DEVICES solo
+# crece en sitio (un create no copia toda la flota): get() e "in" son seguros,
+# pero para iterarlo desde otro hilo hay que usar all_devices().
+_lock = threading.RLock()
+
+
+@contextmanager
+def transaction():
+    """Run several model operations atomically; their changes are delivered as one batch."""
+    with batch(), _lock:
+        yield
+
+
+def _put_device(dev: "Device"):
+    # O(1): sin copiar DEVICES ni el bucket del tipo (call with _lock held)
+    DEVICES[dev.id] = dev
+    _BY_TYPE.setdefault(dev.type, {})[dev.id] = dev
+
+
+def _set_devices(devices: Dict[str, "Device"]):
+    global DEVICES, _BY_TYPE
+    _BY_TYPE = _index_by_type(devices)
+    DEVICES = devices
+
+
 # ================================
-# ACTION LOG (igual que antes)
+# ACTION LOG (ring buffer acotado)
 # ================================
-action_log: List[Dict[str, Any]] = []
+class RingBuffer:
+    """Fixed-capacity append-only buffer; the oldest item is overwritten when full."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._items: List[Any] = [None] * capacity
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i: int):
+        """Item by age: 0 is the oldest, -1 the newest."""
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("ring buffer index out of range")
+        return self._items[(self._start + i) % self.capacity]
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def append(self, item: Any):
+        end = (self._start + self._len) % self.capacity
+        self._items[end] = item
+        if self._len < self.capacity:
+            self._len += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def latest(self, n: int) -> List[Any]:
+        """Newest-first list with at most n items (O(n), independent of capacity)."""
+        n = max(0, min(n, self._len))
+        last = self._start + self._len - 1
+        return [self._items[(last - i) % self.capacity] for i in range(n)]
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._len = 0
+
+
+ACTION_LOG_CAPACITY = 10_000
+DEVICE_LOG_CAPACITY = 200
+
+action_log = RingBuffer(ACTION_LOG_CAPACITY)
+# Indice secundario: ultimas entradas de cada device
+_device_logs: Dict[str, RingBuffer] = {}
+
+
+def configure_action_log(capacity: int = None, per_device: int = None):
+    """Resize the action log (keeps the newest entries that still fit)."""
+    with _lock:
+        _configure_action_log(capacity, per_device)
+
+
+def _configure_action_log(capacity, per_device):
+    global action_log, ACTION_LOG_CAPACITY, DEVICE_LOG_CAPACITY
+    if capacity is not None:
+        old = list(action_log)
+        ACTION_LOG_CAPACITY = capacity
+        action_log = RingBuffer(capacity)
+        for entry in old[-capacity:]:
+            action_log.append(entry)
+    if per_device is not None:
+        DEVICE_LOG_CAPACITY = per_device
+        for did, ring in list(_device_logs.items()):
+            new_ring = RingBuffer(per_device)
+            for entry in list(ring)[-per_device:]:
+                new_ring.append(entry)
+            _device_logs[did] = new_ring
+
+
+# ================================
+# JOURNAL (persistencia opcional, ver persistence.py)
+# ================================
+_journal = None
+
+
+def set_journal(journal):
+    """Attach (or detach with None) a journal that receives every state change."""
+    global _journal
+    _journal = journal
+
+
+def _record(kind: str, data: Dict[str, Any]):
+    if _journal is not None:
+        _journal.append(kind, data)
+
+
+# ================================
+# CHANGE NOTIFICATIONS (pub/sub)
+# ================================
+class Change(NamedTuple):
+    kind: str                 # 'state' | 'device' | 'room' | 'assign' | 'unassign' | 'reset'
+    device_id: Optional[str] = None
+    room: Optional[str] = None
+    value: Any = None
+
+
+# Cambios ocurridos dentro de un mismo "tick" se entregan juntos
+TICK = 0.02
+
+_subscribers: Dict[int, Any] = {}
+_next_token = 0
+_pending_changes: List[Change] = []
+_batch_depth = 0
+_flush_timer = None
+_changes_lock = threading.RLock()
+# Contadores de version por tipo de cambio (sellos para caches y ETags)
+_versions: Dict[str, int] = {}
+
+
+def subscribe(callback: Callable[[List[Change]], None], device_id: str = None, room: str = None) -> int:
+    """Call callback(changes) with batches of changes.
+
+    With device_id only that device's changes are delivered; with room, changes
+    to the room and to devices in it; with neither, every change. Returns a
+    token for unsubscribe().
+    """
+    global _next_token
+    with _changes_lock:
+        _next_token += 1
+        _subscribers[_next_token] = (callback, device_id, room)
+        return _next_token
+
+
+def unsubscribe(token: int):
+    with _changes_lock:
+        _subscribers.pop(token, None)
+
+
+@contextmanager
+def batch():
+    """Group every change made inside the block into a single delivered batch."""
+    global _batch_depth
+    with _changes_lock:
+        _batch_depth += 1
+    try:
+        yield
+    finally:
+        with _changes_lock:
+            _batch_depth -= 1
+            done = _batch_depth == 0
+        if done:
+            flush_changes()
+
+
+def _emit(change: Change):
+    global _flush_timer
+    with _changes_lock:
+        _versions[change.kind] = _versions.get(change.kind, 0) + 1
+        _pending_changes.append(change)
+        if _batch_depth or _flush_timer is not None:
+            return
+        if TICK > 0:
+            _flush_timer = clock.call_later(TICK, flush_changes)
+            return
+    flush_changes()
+
+
+def version(*kinds: str) -> int:
+    """Number of changes emitted so far (of the given kinds, or of any kind)."""
+    versions = _versions
+    if not kinds:
+        return sum(versions.values())
+    return sum(versions.get(k, 0) for k in kinds)
+
+
+def _wants(device_id, room, change: Change) -> bool:
+    if device_id is not None:
+        return change.device_id == device_id
+    if room is not None:
+        if change.room is not None:
+            return change.room == room
+        r = ROOMS.get(room)
+        return bool(r) and change.device_id in r["device_ids"]
+    return True
+
+
+def flush_changes():
+    """Deliver pending changes to subscribers now."""
+    global _flush_timer
+    with _changes_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        changes = _pending_changes[:]
+        _pending_changes.clear()
+        subs = list(_subscribers.values())
+    if not changes:
+        return
+    for callback, device_id, room in subs:
+        selected = [c for c in changes if _wants(device_id, room, c)]
+        if selected:
+            try:
+                callback(selected)
+            except Exception:
+                # Un suscriptor roto no debe dejar sin el lote a los siguientes
+                log.exception("error delivering model changes to %r", callback)
 
 
 def now_str():
     return datetime.now().strftime("%H:%M:%S")
 
 
+class ActionEntry:
+    """One action log record. Only the epoch timestamp is stored; strings are
+    formatted at display time with format_time()."""
+
+    __slots__ = ("seq", "ts", "device", "action", "user")
+
+    def __init__(self, seq: int, ts: float, device: str, action: str, user: str):
+        self.seq = seq
+        self.ts = ts
+        self.device = device
+        self.action = action
+        self.user = user
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "ts": self.ts, "device": self.device,
+                "action": self.action, "user": self.user}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ActionEntry":
+        # Las entradas antiguas solo tenian "time" (HH:MM:SS), sin fecha: ts = 0
+        return cls(d.get("seq", 0), d.get("ts", 0.0), d["device"], d["action"], d["user"])
+
+    # Compatibilidad con el formato dict anterior (entry["device"], entry["time"])
+    def __getitem__(self, key: str):
+        if key == "time":
+            return format_time(self.ts, "%H:%M:%S")
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __repr__(self):
+        return f"ActionEntry({self.seq}, {format_time(self.ts)}, {self.device!r}, {self.action!r}, {self.user!r})"
+
+
+def format_time(ts: float, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
+    return datetime.fromtimestamp(ts).strftime(fmt)
+
+
+# Numero de secuencia de la ultima entrada del log (cursor para consultas)
+_log_seq = 0
+
+
 def log_action(device_id: str, action: str, user: str = "User"):
-    entry = {"time": now_str(), "device": device_id, "action": action, "user": user}
-    action_log.insert(0, entry)
+    global _log_seq
+    with _lock:
+        _log_seq += 1
+        # Nunca hacia atras (reloj ajustado): _bisect_log e iter_actions asumen ts ordenados
+        ts = time.time()
+        if action_log:
+            ts = max(ts, action_log[-1].ts)
+        entry = ActionEntry(_log_seq, ts, device_id, action, user)
+        _append_log(entry)
+        _record("log", entry.to_dict())
+
+
+def _append_log(entry: ActionEntry):
+    global _log_seq
+    if not isinstance(entry, ActionEntry):
+        entry = ActionEntry.from_dict(entry)
+        if not entry.seq:
+            _log_seq += 1
+            entry.seq = _log_seq
+    _log_seq = max(_log_seq, entry.seq)
+    action_log.append(entry)
+    device_id = entry.device
+    ring = _device_logs.get(device_id)
+    if ring is None:
+        ring = _device_logs[device_id] = RingBuffer(DEVICE_LOG_CAPACITY)
+    ring.append(entry)
 
 
 def set_device_state(device_id: str, new_state: Any, user: str = "User"):
-    d = DEVICES.get(device_id)
-    if not d:
-        return
-    d.state = new_state
-    log_action(device_id, str(new_state), user)
+    with _lock:
+        d = DEVICES.get(device_id)
+        if not d:
+            return
+        d.state = new_state
+        _record("state", {"id": device_id, "state": new_state})
+        _emit(Change("state", device_id, value=new_state))
+        log_action(device_id, str(new_state), user)
 
 
 def set_device_value(device_id: str, value: Any, user: str = "User"):
@@ -52,94 +398,476 @@ def set_device_value(device_id: str, value: Any, user: str = "User"):
     set_device_state(device_id, value, user)
 
 
+def apply_states(states: Dict[str, Any], user: str = "User", label: str = None) -> List[str]:
+    """Set many device states atomically, with one journal event and one log entry.
+
+    Unknown ids and devices already in the target state are skipped; returns
+    the ids that changed. Subscribers get every change in a single batch.
+    """
+    with transaction():
+        devices = DEVICES
+        changed = {did: state for did, state in states.items()
+                   if did in devices and devices[did].state != state}
+        if not changed:
+            return []
+        _apply_states(changed)
+        _record("states", changed)
+        for did, state in changed.items():
+            _emit(Change("state", did, value=state))
+        log_action("*", label or f"set {len(changed)} devices", user)
+    return list(changed)
+
+
+def _apply_states(states: Dict[str, Any]):
+    devices = DEVICES
+    for did, state in states.items():
+        d = devices.get(did)
+        if d:
+            d.state = state
+
+
 def get_recent_actions(device_id: str = None, limit: int = 10):
-    if device_id:
-        return [a for a in action_log if a["device"] == device_id][:limit]
-    return action_log[:limit]
+    """Newest-first log entries, optionally only for one device."""
+    with _lock:
+        if device_id:
+            ring = _device_logs.get(device_id)
+            return ring.latest(limit) if ring else []
+        return action_log.latest(limit)
+
+
+def _bisect_log(key: Callable[[ActionEntry], float], value: float) -> int:
+    # Primera posicion del ring con key(entry) >= value (seq y ts crecen con la posicion)
+    lo, hi = 0, len(action_log)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key(action_log[mid]) < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _entry_by_seq(seq: int) -> Optional[ActionEntry]:
+    with _lock:
+        n = len(action_log)
+        if n == 0:
+            return None
+        # Normalmente los seq son consecutivos: acceso O(1) por posicion
+        i = seq - action_log[0].seq
+        if 0 <= i < n and action_log[i].seq == seq:
+            return action_log[i]
+        i = _bisect_log(lambda e: e.seq, seq)
+        return action_log[i] if i < n and action_log[i].seq == seq else None
+
+
+def iter_actions(since: float = None, until: float = None, user: str = None, action: str = None,
+                 device_id: str = None, before: int = None, after: int = None,
+                 newest_first: bool = True) -> Iterator[ActionEntry]:
+    """Lazily scan the whole action log with filters.
+
+    since/until are epoch seconds (inclusive, located by binary search),
+    before/after are "seq" cursors (exclusive). Entries are fetched one at a
+    time, so memory stays constant however large the log is.
+    """
+    with _lock:
+        n = len(action_log)
+        if not n:
+            return
+        first, last = action_log[0].seq, action_log[-1].seq
+        if since is not None:
+            i = _bisect_log(lambda e: e.ts, since)
+            if i == n:
+                return
+            first = max(first, action_log[i].seq)
+        if until is not None:
+            i = _bisect_log(lambda e: e.ts, until + 1e-6)
+            if i == 0:
+                return
+            last = min(last, action_log[i - 1].seq)
+    lo = first if after is None else max(first, after + 1)
+    hi = last if before is None else min(last, before - 1)
+    seqs = range(hi, lo - 1, -1) if newest_first else range(lo, hi + 1)
+    for seq in seqs:
+        entry = _entry_by_seq(seq)
+        if entry is None:
+            if newest_first:
+                return  # ya desalojada del ring: no quedan mas antiguas
+            continue
+        if user is not None and entry.user != user:
+            continue
+        if action is not None and entry.action != action:
+            continue
+        if device_id is not None and entry.device != device_id:
+            continue
+        yield entry
+
+
+def actions_between(since: float, until: float = None) -> List[ActionEntry]:
+    """Entries with since <= ts <= until, oldest first."""
+    return list(iter_actions(since=since, until=until, newest_first=False))
 
 
 # ================================
 # ROOMS
 # ================================
-# Cada room es: { "name": str, "device_ids": [str, ...] }
-ROOMS: List[Dict[str, Any]] = []
+# Cada room es: { "name": str, "device_ids": {device_id: None, ...} }
+# (dict usado como set con orden de insercion)
+class RoomRegistry:
+    """Rooms keyed by name, plus a reverse device -> rooms index.
+
+    Mutations replace the affected dicts instead of changing them in place
+    (copy-on-write), so readers can iterate without taking the models lock.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, Dict[str, Any]] = {}
+        self._device_rooms: Dict[str, Dict[str, None]] = {}
+
+    def __iter__(self):
+        return iter(self._rooms.values())
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __contains__(self, name: str):
+        return name in self._rooms
+
+    def get(self, name: str):
+        return self._rooms.get(name)
+
+    def add(self, name: str) -> bool:
+        if name in self._rooms:
+            return False
+        rooms = dict(self._rooms)
+        rooms[name] = {"name": name, "device_ids": {}}
+        self._rooms = rooms
+        return True
+
+    def assign(self, name: str, device_id: str) -> bool:
+        room = self._rooms.get(name)
+        if room is None or device_id in room["device_ids"]:
+            return False
+        room["device_ids"] = {**room["device_ids"], device_id: None}
+        self._device_rooms[device_id] = {**self._device_rooms.get(device_id, {}), name: None}
+        return True
+
+    def assign_many(self, name: str, device_ids) -> List[str]:
+        """Assign several devices with a single copy of the room; returns the newly added ids."""
+        room = self._rooms.get(name)
+        if room is None:
+            return []
+        current = room["device_ids"]
+        added = [did for did in dict.fromkeys(device_ids) if did not in current]
+        if added:
+            room["device_ids"] = {**current, **dict.fromkeys(added)}
+            for did in added:
+                self._device_rooms[did] = {**self._device_rooms.get(did, {}), name: None}
+        return added
+
+    def unassign(self, name: str, device_id: str) -> bool:
+        room = self._rooms.get(name)
+        if room is None or device_id not in room["device_ids"]:
+            return False
+        device_ids = dict(room["device_ids"])
+        del device_ids[device_id]
+        room["device_ids"] = device_ids
+        names = dict(self._device_rooms.get(device_id, {}))
+        names.pop(name, None)
+        if names:
+            self._device_rooms[device_id] = names
+        else:
+            self._device_rooms.pop(device_id, None)
+        return True
+
+    def rooms_of(self, device_id: str) -> List[str]:
+        return list(self._device_rooms.get(device_id, ()))
+
+    def clear(self):
+        self._rooms = {}
+        self._device_rooms = {}
+
+    def load(self, rooms: List[Dict[str, Any]]):
+        """Replace every room at once from [{"name", "device_ids"}, ...]."""
+        new_rooms: Dict[str, Dict[str, Any]] = {}
+        device_rooms: Dict[str, Dict[str, None]] = {}
+        for r in rooms:
+            name = r["name"]
+            ids = dict.fromkeys(r.get("device_ids", ()))
+            if name in new_rooms:
+                ids = {**new_rooms[name]["device_ids"], **ids}
+            new_rooms[name] = {"name": name, "device_ids": ids}
+            for did in ids:
+                device_rooms.setdefault(did, {})[name] = None
+        self._rooms = new_rooms
+        self._device_rooms = device_rooms
+
+
+ROOMS = RoomRegistry()
 
 
 def add_room(name: str):
     """Add a new room with a given name."""
     # Evitar duplicados tontos por nombre
-    for r in ROOMS:
-        if r.get("name") == name:
+    with _lock:
+        if not ROOMS.add(name):
             return
-    ROOMS.append({"name": name, "device_ids": []})
+        _record("room", {"name": name})
+        _emit(Change("room", room=name))
+
+
+def _room_view(room: Dict[str, Any]) -> Dict[str, Any]:
+    # Copia con device_ids como lista, el formato de siempre
+    return {"name": room["name"], "device_ids": list(room["device_ids"])}
 
 
 def get_rooms():
-    """Return list of all rooms."""
-    return ROOMS
+    """Return list of all rooms ({"name", "device_ids": [...]}, plain copies).
+
+    Read-only code that only needs names or membership tests can iterate
+    ROOMS directly and avoid the copies.
+    """
+    return [_room_view(r) for r in ROOMS]
+
 
+def get_room(room_name: str):
+    """Room dict by name (O(1) lookup, device_ids as a list), or None."""
+    room = ROOMS.get(room_name)
+    return _room_view(room) if room else None
 
-def _find_room(room_name: str):
-    for r in ROOMS:
-        if r.get("name") == room_name:
-            return r
-    return None
+
+_find_room = get_room
 
 
 def assign_device_to_room(room_name: str, device_id: str):
     """Añadir un device existente a una room."""
-    room = _find_room(room_name)
-    if not room:
-        return
-    device_ids = room.get("device_ids")
-    if device_ids is None:
-        device_ids = []
-        room["device_ids"] = device_ids
-    if device_id not in device_ids:
-        device_ids.append(device_id)
+    with _lock:
+        if ROOMS.assign(room_name, device_id):
+            _record("assign", {"room": room_name, "device": device_id})
+            _emit(Change("assign", device_id, room_name))
+
 
 def remove_device_from_room(room_name: str, device_id: str):
-    room = _find_room(room_name)
-    if not room:
-        return
-    if device_id in room["device_ids"]:
-        room["device_ids"].remove(device_id)
+    with _lock:
+        if ROOMS.unassign(room_name, device_id):
+            _record("unassign", {"room": room_name, "device": device_id})
+            _emit(Change("unassign", device_id, room_name))
+
+
+def rooms_of_device(device_id: str) -> List[str]:
+    """Names of the rooms a device is assigned to."""
+    return ROOMS.rooms_of(device_id)
+
 
 def get_devices_in_room(room_name: str) -> List[Device]:
     """Lista de devices asociados a esa room."""
-    room = _find_room(room_name)
+    room = ROOMS.get(room_name)
     if not room:
         return []
-    ids = room.get("device_ids") or []
-    return [DEVICES[did] for did in ids if did in DEVICES]
+    return [DEVICES[did] for did in room["device_ids"] if did in DEVICES]
+
+
+# Estado por defecto según tipo
+DEFAULT_STATES = {"switch": "OFF", "lock": "LOCKED", "slider": 0}
+
+# Estados validos de los tipos on/off; los sliders van de 0 a slider_max()
+VALID_STATES = {"switch": ("ON", "OFF"), "lock": ("LOCKED", "UNLOCKED")}
+SLIDER_MAX = {"thermostat": 30}
+SLIDER_MAX_DEFAULT = 3
+
+
+def slider_max(device_id: str = None) -> int:
+    return SLIDER_MAX.get(device_id, SLIDER_MAX_DEFAULT)
+
+# Siguiente sufijo a probar por nombre base (evita probar _1, _2, ... cada vez)
+_id_counters: Dict[str, int] = {}
+
+
+def _allocate_id(name: str, taken=()) -> str:
+    """Unique id from a device name: base, base_1, base_2, ... (call with _lock held)."""
+    base_id = name.lower().replace(" ", "_")
+    suffix = _id_counters.get(base_id, 0)
+    new_id = base_id if suffix == 0 else f"{base_id}_{suffix}"
+    while new_id in DEVICES or new_id in taken:
+        suffix += 1
+        new_id = f"{base_id}_{suffix}"
+    _id_counters[base_id] = suffix + 1
+    return new_id
 
 
 def create_device(name: str, type: str, room_name: str = None, state: Any = None) -> Device:
     """Crear un nuevo dispositivo y (opcionalmente) meterlo en una room."""
 
-    # Estado por defecto según tipo
     if state is None:
-        if type == "switch":
-            state = "OFF"
-        elif type == "lock":
-            state = "LOCKED"
-        elif type == "slider":
-            state = 0
-
-    # Generar id único a partir del nombre
-    base_id = name.lower().replace(" ", "_")
-    new_id = base_id
-    suffix = 1
-    while new_id in DEVICES:
-        new_id = f"{base_id}_{suffix}"
-        suffix += 1
+        state = DEFAULT_STATES.get(type)
 
-    dev = Device(new_id, name, type, state)
-    DEVICES[new_id] = dev
+    with _lock:
+        # Generar id único a partir del nombre
+        new_id = _allocate_id(name)
 
-    log_action(new_id, "created", "User")
+        dev = Device(new_id, name, type, state)
+        _put_device(dev)
+        _record("device", dev.to_dict())
+        _emit(Change("device", new_id, value=state))
 
-    if room_name:
-        assign_device_to_room(room_name, new_id)
+        log_action(new_id, "created", "User")
+
+        if room_name:
+            assign_device_to_room(room_name, new_id)
 
     return dev
+
+
+# ================================
+# BULK IMPORT
+# ================================
+def import_bulk(devices: List[Dict[str, Any]], rooms: List[Dict[str, Any]] = (),
+                user: str = "User") -> List[Device]:
+    """Create many devices and rooms in one transaction with a single summary log entry.
+
+    Device specs are {"name", "type", optional "state", "id", "room"} ("room"
+    may be a name or a list of names); an "id" is kept when it is still free,
+    otherwise one is generated from the name.
+    Rooms are {"name", optional "device_ids"}, where ids refer to the specs.
+    """
+    with transaction():
+        created: List[Device] = []
+        id_map: Dict[str, str] = {}
+        new_devices: Dict[str, Device] = {}
+        for spec in devices:
+            wanted = spec.get("id")
+            if wanted and wanted not in DEVICES and wanted not in new_devices:
+                new_id = wanted
+            else:
+                new_id = _allocate_id(spec["name"], new_devices)
+            state = spec.get("state")
+            if state is None:
+                state = DEFAULT_STATES.get(spec["type"])
+            dev = Device(new_id, spec["name"], spec["type"], state)
+            new_devices[new_id] = dev
+            created.append(dev)
+            if wanted:
+                id_map[wanted] = new_id
+
+        # Rooms: las del fichero mas las indicadas en cada device
+        members: Dict[str, List[str]] = {}
+        for r in rooms:
+            ids = members.setdefault(r["name"], [])
+            ids.extend(id_map.get(did, did) for did in r.get("device_ids", ()))
+        for spec, dev in zip(devices, created):
+            spec_rooms = spec.get("room") or ()
+            for name in [spec_rooms] if isinstance(spec_rooms, str) else spec_rooms:
+                members.setdefault(name, []).append(dev.id)
+
+        data = {
+            "devices": [d.to_dict() for d in created],
+            "rooms": [{"name": name, "device_ids": ids} for name, ids in members.items()],
+        }
+        new_rooms, added = _apply_import(data)
+        _record("import", data)
+
+        for dev in created:
+            _emit(Change("device", dev.id, value=dev.state))
+        for name in new_rooms:
+            _emit(Change("room", room=name))
+        for name, ids in added.items():
+            for did in ids:
+                _emit(Change("assign", did, name))
+
+        log_action("*", f"imported {len(created)} devices, {len(members)} rooms", user)
+    return created
+
+
+def _apply_import(data: Dict[str, Any]):
+    """Apply an import payload; returns (new room names, {room: newly assigned ids})."""
+    for d in data["devices"]:
+        _put_device(Device(d["id"], d["name"], d["type"], d.get("state")))
+    new_rooms, added = [], {}
+    for r in data["rooms"]:
+        if ROOMS.add(r["name"]):
+            new_rooms.append(r["name"])
+        added[r["name"]] = ROOMS.assign_many(r["name"], r["device_ids"])
+    return new_rooms, added
+
+
+# ================================
+# SNAPSHOT / RESTORE
+# ================================
+def snapshot() -> Dict[str, Any]:
+    """Plain-data copy of devices, rooms and the action log."""
+    with _lock:
+        return {
+            "devices": [d.to_dict() for d in DEVICES.values()],
+            "rooms": [{"name": r["name"], "device_ids": list(r["device_ids"])} for r in ROOMS],
+            "actions": [e.to_dict() for e in action_log],
+        }
+
+
+def capture_snapshot() -> Callable[[], Dict[str, Any]]:
+    """Consistent capture of the state for a later snapshot().
+
+    Only references and the device states are taken under the lock (the room
+    member dicts are copy-on-write, log entries are immutable);
+    the returned function builds the snapshot() dict without the lock.
+    """
+    with _lock:
+        devices = list(DEVICES.values())
+        states = [d.state for d in devices]
+        rooms = [(r["name"], r["device_ids"]) for r in ROOMS]
+        actions = list(action_log)
+
+    def build() -> Dict[str, Any]:
+        return {
+            "devices": [{"id": d.id, "name": d.name, "type": d.type, "state": state}
+                        for d, state in zip(devices, states)],
+            "rooms": [{"name": name, "device_ids": list(ids)} for name, ids in rooms],
+            "actions": [e.to_dict() for e in actions],
+        }
+    return build
+
+
+def restore(data: Dict[str, Any]):
+    """Replace the in-memory state with a snapshot() result (nothing is journaled)."""
+    global _log_seq
+    with _lock:
+        _set_devices({d["id"]: Device(d["id"], d["name"], d["type"], d.get("state"))
+                      for d in data.get("devices", [])})
+        ROOMS.load(data.get("rooms", []))
+        action_log.clear()
+        _device_logs.clear()
+        _log_seq = 0
+        for entry in data.get("actions", []):
+            _append_log(entry)
+        # Todo cambio: los suscriptores deben reconstruir su estado
+        _emit(Change("reset"))
+
+
+def apply_event(kind: str, data: Dict[str, Any]):
+    """Re-apply one journaled change, used when replaying the journal on startup."""
+    saved = _journal
+    set_journal(None)
+    try:
+        _apply_event(kind, data)
+    finally:
+        set_journal(saved)
+
+
+def _apply_event(kind: str, data: Dict[str, Any]):
+    with _lock:
+        if kind == "state":
+            d = DEVICES.get(data["id"])
+            if d:
+                d.state = data["state"]
+        elif kind == "device":
+            _put_device(Device(data["id"], data["name"], data["type"], data.get("state")))
+        elif kind == "room":
+            add_room(data["name"])
+        elif kind == "assign":
+            assign_device_to_room(data["room"], data["device"])
+        elif kind == "unassign":
+            remove_device_from_room(data["room"], data["device"])
+        elif kind == "import":
+            _apply_import(data)
+        elif kind == "states":
+            _apply_states(data)
+        elif kind == "log":
+            _append_log(data)
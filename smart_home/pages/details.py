@@ -8,7 +8,7 @@ def view(app, device_id: str):
         return ft.Column([ft.Text("Device not found"), ft.ElevatedButton("Back to overview", on_click=lambda e: app.page.go("/"))])
 
     actions = models.get_recent_actions(device_id=device_id, limit=10)
-    action_texts = [ft.Text(f"{a['time']} - {a['action']} ({a['user']})") for a in actions]
+    action_texts = [ft.Text(f"{models.format_time(a.ts)} - {a.action} ({a.user})") for a in actions]
 
     return ft.Column([
         ft.Text(f"{d.name} details", size=28, weight=ft.FontWeight.BOLD),
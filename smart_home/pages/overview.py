@@ -1,5 +1,9 @@
 import flet as ft
-from smart_home import models
+from smart_home import aio, models
+from smart_home.coalesce import COALESCER
+
+PAGE_SIZE = 60  # cards construidas por grupo y pagina
+ONOFF_TYPES = ("switch", "lock")  # tipos con card de boton; otros tipos no se muestran aqui
 
 
 # ------------------------------
@@ -22,23 +26,22 @@ def _device_card(app, device: models.Device):
     status_text = ft.Text(f"Status: {device.state}", size=14, color=ft.Colors.BLUE_GREY_700)
 
     # Acción principal según tipo de dispositivo
-    if device.type == "switch":
-        action_label = "Turn ON" if device.state == "OFF" else "Turn OFF"
-
-        def on_click(e):
-            new = "ON" if device.state == "OFF" else "OFF"
-            models.set_device_state(device.id, new)
-            app.show_overview()
+    def action_label(d):
+        if d.type == "switch":
+            return "Turn ON" if d.state == "OFF" else "Turn OFF"
+        if d.type == "lock":
+            return "Unlock" if d.state == "LOCKED" else "Lock"
+        return None
 
-    elif device.type == "lock":
-        action_label = "Unlock" if device.state == "LOCKED" else "Lock"
-
-        def on_click(e):
-            new = "UNLOCKED" if device.state == "LOCKED" else "LOCKED"
-            models.set_device_state(device.id, new)
-            app.show_overview()
-    else:
-        action_label = None
+    async def on_click(e):
+        d = models.DEVICES.get(device.id)
+        if not d:
+            return
+        if d.type == "switch":
+            new = "ON" if d.state == "OFF" else "OFF"
+        else:
+            new = "UNLOCKED" if d.state == "LOCKED" else "LOCKED"
+        await aio.set_device_state(d.id, new)
 
     # Botones
     details_btn = ft.TextButton(
@@ -46,7 +49,7 @@ def _device_card(app, device: models.Device):
         on_click=lambda e: app.page.go(f"/device/{device.id}")
     )
 
-    action_btn = ft.ElevatedButton(action_label, on_click=on_click)
+    action_btn = ft.ElevatedButton(action_label(device), on_click=on_click)
 
     # TARJETA
     card = ft.Container(
@@ -65,6 +68,20 @@ def _device_card(app, device: models.Device):
         )
     )
 
+    # Parchea solo los controles cuyo valor cambió
+    def sync(d):
+        changed = False
+        status = f"Status: {d.state}"
+        if status_text.value != status:
+            status_text.value = status
+            changed = True
+        label_text = action_label(d)
+        if action_btn.text != label_text:
+            action_btn.text = label_text
+            changed = True
+        return changed
+
+    card.data = sync
     return card
 
 
@@ -88,8 +105,11 @@ def _slider_card(app, device: models.Device):
     icon = ft.Icon(icon_name, size=32, color=ft.Colors.BLUE_GREY_700)
 
     # Etiquetas
+    def label_for(value):
+        return f"Set point: {value} °C" if device.id == "thermostat" else f"Fan speed: {value}"
+
     label = ft.Text(
-        f"Set point: {device.state} °C" if device.id == "thermostat" else f"Fan speed: {device.state}",
+        label_for(device.state),
         size=14,
         color=ft.Colors.BLUE_GREY_700
     )
@@ -97,17 +117,23 @@ def _slider_card(app, device: models.Device):
     # Slider
     slider = ft.Slider(
         min=0,
-        max=30 if device.id == "thermostat" else 3,
+        max=models.slider_max(device.id),
         value=device.state,
-        divisions=30 if device.id == "thermostat" else 3
+        divisions=models.slider_max(device.id)
     )
 
+    # Valores intermedios: solo el control local; el modelo recibe el valor final
     def on_change(e):
         v = round(e.control.value, 1) if device.id == "thermostat" else int(e.control.value)
-        models.set_device_value(device.id, v)
-        app.show_overview()
+        label.value = label_for(v)
+        app.request_update()  # agrupado con el resto de la sesion
+        COALESCER.push(device.id, v)
+
+    def on_change_end(e):
+        COALESCER.flush(device.id)
 
     slider.on_change = on_change
+    slider.on_change_end = on_change_end
 
     # TARJETA
     card = ft.Container(
@@ -126,35 +152,137 @@ def _slider_card(app, device: models.Device):
         ], spacing=10)
     )
 
+    def sync(d):
+        if COALESCER.pending(d.id) is not None:
+            return False  # arrastre en curso, no pisar el valor local
+        changed = False
+        text = label_for(d.state)
+        if label.value != text:
+            label.value = text
+            changed = True
+        if slider.value != d.state:
+            slider.value = d.state
+            changed = True
+        return changed
+
+    card.data = sync
     return card
 
 
+# ------------------------------
+# ESTADO PERSISTENTE (una card por device id)
+# ------------------------------
+class _OverviewState:
+    def __init__(self, app):
+        self.cards = {}  # device id -> card
+        self.onoff_row = ft.Row(wrap=True, spacing=20, run_spacing=20)
+        self.slider_row = ft.Row(wrap=True, spacing=20, run_spacing=20)
+        # Paginacion: cuantas cards de cada grupo se construyen
+        self.limits = {"onoff": PAGE_SIZE, "slider": PAGE_SIZE}
+        self.more = {
+            group: ft.TextButton(visible=False, on_click=lambda e, g=group: _show_more(app, g))
+            for group in self.limits
+        }
+        self.column = ft.Column(
+            [
+                ft.Text("On/Off devices", size=22, weight="bold"),
+                self.onoff_row,
+                self.more["onoff"],
+
+                ft.Divider(height=20),
+
+                ft.Text("Slider controlled devices", size=22, weight="bold"),
+                self.slider_row,
+                self.more["slider"],
+            ],
+            scroll=ft.ScrollMode.AUTO,
+            expand=True,
+        )
+
+
+def _state(app) -> _OverviewState:
+    st = getattr(app, "_overview_state", None)
+    if st is None:
+        st = app._overview_state = _OverviewState(app)
+    return st
+
+
+def _show_more(app, group: str):
+    _state(app).limits[group] += PAGE_SIZE
+    refresh(app)
+
+
+def _diff(app) -> bool:
+    """Sync the persistent cards with models.DEVICES; True if any control changed."""
+    st = _state(app)
+    changed = False
+
+    # Devices eliminados
+    for did in [did for did in st.cards if did not in models.DEVICES]:
+        card = st.cards.pop(did)
+        for row in (st.onoff_row, st.slider_row):
+            if card in row.controls:
+                row.controls.remove(card)
+        changed = True
+
+    # Devices nuevos o modificados (solo hasta el limite de cada grupo),
+    # leidos del indice por tipo en vez de filtrar DEVICES entero
+    totals = {}
+    for group, row, devices in (("onoff", st.onoff_row, models.devices_of_type(*ONOFF_TYPES)),
+                                ("slider", st.slider_row, models.devices_of_type("slider"))):
+        totals[group] = len(devices)
+        for d in devices[:st.limits[group]]:
+            card = st.cards.get(d.id)
+            if card is None:
+                card = _slider_card(app, d) if group == "slider" else _device_card(app, d)
+                row.controls.append(card)
+                st.cards[d.id] = card
+                changed = True
+            elif card.data(d):
+                changed = True
+
+    # Botones "Show more"
+    for group, row in (("onoff", st.onoff_row), ("slider", st.slider_row)):
+        hidden = totals[group] - len(row.controls)
+        btn = st.more[group]
+        text = f"Show {min(hidden, PAGE_SIZE)} more ({hidden} hidden)" if hidden > 0 else None
+        if btn.visible != (hidden > 0) or (text and btn.text != text):
+            btn.visible = hidden > 0
+            btn.text = text
+            changed = True
+
+    return changed
+
+
+def refresh(app):
+    """Patch the overview in place and push a single update if something changed."""
+    if _diff(app):
+        app.request_update()
+
+
+def on_change(app, changes):
+    """React to a batch of model changes, touching only the affected cards."""
+    st = _state(app)
+    changed = False
+    for c in changes:
+        if c.kind == "device" and c.device_id not in st.cards:
+            d = models.DEVICES.get(c.device_id)
+            if d is not None and d.type not in ONOFF_TYPES and d.type != "slider":
+                continue  # tipo sin card en esta pagina
+            return refresh(app)  # device nuevo: diff completo (raro)
+        if c.kind != "state":
+            continue
+        card = st.cards.get(c.device_id)
+        d = models.DEVICES.get(c.device_id)
+        if card is not None and d is not None and card.data(d):
+            changed = True
+    if changed:
+        app.request_update()
+
+
 # ------------------------------
 # VISTA PRINCIPAL (Overview)
 # ------------------------------
 def view(app):
-    onoff_devices = [d for d in models.DEVICES.values() if d.type in ("switch", "lock")]
-    slider_devices = [d for d in models.DEVICES.values() if d.type == "slider"]
-
-    return ft.Column(
-        [
-            ft.Text("On/Off devices", size=22, weight="bold"),
-            ft.Row(
-                [_device_card(app, d) for d in onoff_devices],
-                wrap=True,
-                spacing=20,
-                run_spacing=20
-            ),
-
-            ft.Divider(height=20),
-
-            ft.Text("Slider controlled devices", size=22, weight="bold"),
-            ft.Row(
-                [_slider_card(app, d) for d in slider_devices],
-                wrap=True,
-                spacing=20,
-                run_spacing=20
-            ),
-        ],
-        scroll=ft.ScrollMode.AUTO
-    )
+    _diff(app)
+    return _state(app).column
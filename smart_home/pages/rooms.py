@@ -1,29 +1,31 @@
-import flet as ft
-from smart_home import models
+from itertools import islice
 
+import flet as ft
+from smart_home import models, scenes
 
-def view(app):
+PAGE_SIZE = 20            # rooms construidas por pagina
+DEVICES_PER_ROOM = 25     # filas de devices visibles antes de "Show all"
+SCROLL_THRESHOLD = 300    # pixeles antes del final para cargar la siguiente pagina
 
-    page = app.page
 
-    # ===========================================
-    # DIALOG: ADD ROOM
-    # ===========================================
+# ===========================================
+# DIALOGS (uno por tipo y pagina, reutilizados via app.dialogs)
+# ===========================================
 
+def _add_room_dialog(app):
     name_field = ft.TextField(label="Room name", autofocus=True)
 
     def close_add_room(e=None):
-        add_room_dialog.open = False
-        page.update()
+        app.dialogs.close("add_room")
+        app.request_update()
 
     def add_room(e=None):
-        name = name_field.value.strip()
+        name = (name_field.value or "").strip()
         if name:
             models.add_room(name)
         close_add_room()
-        refresh()
 
-    add_room_dialog = ft.AlertDialog(
+    dialog = ft.AlertDialog(
         modal=True,
         title=ft.Text("Add new room"),
         content=name_field,
@@ -32,17 +34,11 @@ def view(app):
             ft.FilledButton("Add", on_click=add_room),
         ],
     )
-    page.overlay.append(add_room_dialog)
+    dialog.data = name_field
+    return dialog
 
-    def open_add_room(e):
-        name_field.value = ""
-        add_room_dialog.open = True
-        page.update()
-
-    # ===========================================
-    # DIALOG: ADD DEVICE
-    # ===========================================
 
+def _add_device_dialog(app):
     device_name = ft.TextField(label="Device name")
     device_type = ft.Dropdown(
         label="Device type",
@@ -54,16 +50,15 @@ def view(app):
     )
 
     def close_add_device(e=None):
-        add_device_dialog.open = False
-        page.update()
+        app.dialogs.close("add_device")
+        app.request_update()
 
     def confirm_add_device(e=None):
         if device_name.value and device_type.value:
             models.create_device(device_name.value, device_type.value)
         close_add_device()
-        refresh()
 
-    add_device_dialog = ft.AlertDialog(
+    dialog = ft.AlertDialog(
         modal=True,
         title=ft.Text("Add new device"),
         content=ft.Column([device_name, device_type]),
@@ -72,52 +67,63 @@ def view(app):
             ft.FilledButton("Create", on_click=confirm_add_device),
         ],
     )
-    page.overlay.append(add_device_dialog)
+    dialog.data = (device_name, device_type)
+    return dialog
 
-    def open_add_device(e):
-        device_name.value = ""
-        device_type.value = None
-        add_device_dialog.open = True
-        page.update()
 
-    # ===========================================
-    # DIALOG: ASSIGN DEVICE
-    # ===========================================
+def _assign_dialog(app):
+    device_dd = ft.Dropdown(label="Select device")
+    title = ft.Text()
+    state = {"room": None}
 
-    def open_assign_dialog(room_name: str):
-        room = models._find_room(room_name)
-        assigned = set(room["device_ids"])
-        available = [d for d in models.DEVICES.values() if d.id not in assigned]
+    def cancel(e=None):
+        app.dialogs.close("assign")
+        app.request_update()
 
-        device_dd = ft.Dropdown(
-            label="Select device",
-            options=[ft.dropdown.Option(d.id) for d in available],
-        )
+    def confirm(e=None):
+        if device_dd.value and state["room"]:
+            models.assign_device_to_room(state["room"], device_dd.value)
+        cancel()
 
-        def cancel(e=None):
-            assign_dialog.open = False
-            page.update()
-
-        def confirm(e=None):
-            if device_dd.value:
-                models.assign_device_to_room(room_name, device_dd.value)
-            assign_dialog.open = False
-            page.update()
-            refresh()
-
-        assign_dialog = ft.AlertDialog(
-            modal=True,
-            title=ft.Text(f"Assign device to {room_name}"),
-            content=device_dd,
-            actions=[
-                ft.TextButton("Cancel", on_click=cancel),
-                ft.FilledButton("Assign", on_click=confirm),
-            ],
-        )
+    dialog = ft.AlertDialog(
+        modal=True,
+        title=title,
+        content=device_dd,
+        actions=[
+            ft.TextButton("Cancel", on_click=cancel),
+            ft.FilledButton("Assign", on_click=confirm),
+        ],
+    )
+    dialog.data = (state, title, device_dd)
+    return dialog
+
+
+def view(app):
+
+    def open_add_room(e):
+        dialog = app.dialogs.show("add_room", lambda: _add_room_dialog(app))
+        dialog.data.value = ""
+        app.request_update()
+
+    def open_add_device(e):
+        dialog = app.dialogs.show("add_device", lambda: _add_device_dialog(app))
+        device_name, device_type = dialog.data
+        device_name.value = ""
+        device_type.value = None
+        app.request_update()
 
-        page.overlay.append(assign_dialog)
-        assign_dialog.open = True
-        page.update()
+    def open_assign_dialog(room_name: str):
+        room = models.ROOMS.get(room_name)
+        assigned = room["device_ids"] if room else {}
+        available = [d for d in models.all_devices() if d.id not in assigned]
+
+        dialog = app.dialogs.show("assign", lambda: _assign_dialog(app))
+        state, title, device_dd = dialog.data
+        state["room"] = room_name
+        title.value = f"Assign device to {room_name}"
+        device_dd.options = [ft.dropdown.Option(d.id) for d in available]
+        device_dd.value = None
+        app.request_update()
 
     # ===========================================
     # REMOVE DEVICE FROM ROOM
@@ -125,7 +131,10 @@ def view(app):
 
     def remove_device(room_name: str, device_id: str):
         models.remove_device_from_room(room_name, device_id)
-        refresh()
+
+    def room_off(room_name: str):
+        # Un solo lote: una entrada de log y un update para todos los devices
+        scenes.room_off(room_name)
 
     # ===========================================
     # OVERVIEW FILTER
@@ -134,79 +143,144 @@ def view(app):
     filter_dd = ft.Dropdown(
         label="Filter by room",
         options=[ft.dropdown.Option("All")] +
-                [ft.dropdown.Option(r["name"]) for r in models.get_rooms()],
+                [ft.dropdown.Option(r["name"]) for r in models.ROOMS],
         value="All",
         on_change=lambda e: refresh(),
     )
 
-    rooms_list = ft.Column()
+    # Lista perezosa: solo se construyen las cards de las rooms visibles
+    rooms_list = ft.ListView(expand=True, spacing=0, on_scroll_interval=100)
+    shown = {"count": 0}
+    expanded_rooms = set()  # rooms con la lista completa de devices desplegada
+
+    def selected_rooms():
+        selected = filter_dd.value
+        if selected == "All":
+            return list(models.ROOMS)
+        # Filtro via indice por nombre, sin recorrer las rooms
+        room = models.ROOMS.get(selected)
+        return [room] if room else []
 
     # ===========================================
-    # REFRESH UI
+    # ROOM CARD
     # ===========================================
 
-    def refresh():
-        rooms_list.controls = []
-        rooms = models.get_rooms()
-        selected = filter_dd.value
+    def toggle_room(room_name: str):
+        expanded_rooms.symmetric_difference_update({room_name})
+        refresh(keep_count=True)
 
-        for r in rooms:
-            room_name = r["name"]
+    def room_card(r):
+        room_name = r["name"]
+        device_ids = r["device_ids"]
+        limit = None if room_name in expanded_rooms else DEVICES_PER_ROOM
 
-            if selected != "All" and selected != room_name:
+        device_widgets = []
+        for did in islice(device_ids, limit):
+            d = models.DEVICES.get(did)
+            if d is None:
                 continue
-
-            devices = models.get_devices_in_room(room_name)
-
-            device_widgets = []
-            for d in devices:
-                device_widgets.append(
-                    ft.Row(
-                        [
-                            ft.Text(f"{d.name} ({d.type})"),
-                            ft.IconButton(
-                                ft.Icons.DELETE,
-                                tooltip="Remove device",
-                                on_click=lambda e, rn=room_name, did=d.id: remove_device(rn, did),
-                                icon_color=ft.Colors.RED,
-                            )
-                        ],
-                        alignment="spaceBetween",
-                    )
+            device_widgets.append(
+                ft.Row(
+                    [
+                        ft.Text(f"{d.name} ({d.type})"),
+                        ft.IconButton(
+                            ft.Icons.DELETE,
+                            tooltip="Remove device",
+                            on_click=lambda e, rn=room_name, did=d.id: remove_device(rn, did),
+                            icon_color=ft.Colors.RED,
+                        )
+                    ],
+                    alignment="spaceBetween",
                 )
-
-            room_card = ft.Container(
-                content=ft.Column([
-                    ft.Row(
-                        [
-                            ft.Text(room_name, size=20, weight="bold"),
+            )
+        if limit is not None and len(device_ids) > limit:
+            device_widgets.append(ft.TextButton(
+                f"Show all {len(device_ids)} devices",
+                on_click=lambda e, rn=room_name: toggle_room(rn),
+            ))
+        elif limit is None and len(device_ids) > DEVICES_PER_ROOM:
+            device_widgets.append(ft.TextButton(
+                "Show less",
+                on_click=lambda e, rn=room_name: toggle_room(rn),
+            ))
+
+        return ft.Container(
+            content=ft.Column([
+                ft.Row(
+                    [
+                        ft.Text(room_name, size=20, weight="bold"),
+                        ft.Row([
+                            ft.OutlinedButton(
+                                "All off",
+                                icon=ft.Icons.POWER_SETTINGS_NEW,
+                                on_click=lambda e, rn=room_name: room_off(rn),
+                            ),
                             ft.FilledButton(
                                 "Assign device",
                                 icon=ft.Icons.DEVICE_HUB,
                                 on_click=lambda e, rn=room_name: open_assign_dialog(rn),
-                            )
-                        ], alignment="spaceBetween",
-                    ),
-                    ft.Divider(),
-                    ft.Column(device_widgets) if device_widgets
-                    else ft.Text("No devices assigned", italic=True),
-                ]),
-                padding=15,
-                bgcolor=ft.Colors.WHITE,
-                border_radius=10,
-                border=ft.border.all(1, ft.Colors.GREY_300),
-                margin=ft.margin.only(bottom=15)
-            )
+                            ),
+                        ]),
+                    ], alignment="spaceBetween",
+                ),
+                ft.Divider(),
+                ft.Column(device_widgets) if device_widgets
+                else ft.Text("No devices assigned", italic=True),
+            ]),
+            padding=15,
+            bgcolor=ft.Colors.WHITE,
+            border_radius=10,
+            border=ft.border.all(1, ft.Colors.GREY_300),
+            margin=ft.margin.only(bottom=15)
+        )
+
+    # ===========================================
+    # PAGINAS / SCROLL INFINITO
+    # ===========================================
+
+    load_more_btn = ft.TextButton("Load more rooms", on_click=lambda e: load_more())
+
+    def load_more() -> bool:
+        rooms = selected_rooms()
+        start = shown["count"]
+        if start >= len(rooms):
+            return False
+        if rooms_list.controls and rooms_list.controls[-1] is load_more_btn:
+            rooms_list.controls.pop()
+        # Solo se construye la pagina nueva; las anteriores se conservan
+        rooms_list.controls.extend(room_card(r) for r in rooms[start:start + PAGE_SIZE])
+        shown["count"] = start + PAGE_SIZE
+        if shown["count"] < len(rooms):
+            rooms_list.controls.append(load_more_btn)
+        app.request_update()
+        return True
+
+    def on_scroll(e):
+        if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - SCROLL_THRESHOLD:
+            load_more()
+
+    rooms_list.on_scroll = on_scroll
+
+    # ===========================================
+    # REFRESH UI
+    # ===========================================
 
-            rooms_list.controls.append(room_card)
+    def refresh(keep_count: bool = False):
+        target = max(shown["count"], PAGE_SIZE) if keep_count else PAGE_SIZE
+        rooms_list.controls = []
+        shown["count"] = 0
+        while shown["count"] < target and load_more():
+            pass
+        app.request_update()
 
+    def refresh_all():
         # update filter options dynamically
         filter_dd.options = [ft.dropdown.Option("All")] + \
-                             [ft.dropdown.Option(r["name"]) for r in models.get_rooms()]
-
-        page.update()
+                             [ft.dropdown.Option(r["name"]) for r in models.ROOMS]
+        refresh(keep_count=True)
 
     refresh()
+    app._rooms_refresh = refresh_all
 
     # ===========================================
     # MAIN LAYOUT
@@ -226,5 +300,12 @@ def view(app):
             ft.Divider(),
             rooms_list
         ],
-        scroll=ft.ScrollMode.AUTO
+        expand=True,
     )
+
+
+def on_change(app, changes):
+    """Rooms, assignments or device list changed: refresh the visible room cards."""
+    refresh = getattr(app, "_rooms_refresh", None)
+    if refresh and any(c.kind != "state" for c in changes):
+        refresh()
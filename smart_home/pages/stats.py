@@ -1,60 +1,50 @@
+from itertools import islice
+
 import flet as ft
 from smart_home import models
-import threading
+from smart_home.chart import PowerChart
 import time
 
-# Historial de consumos (vacío al inicio)
-history = []
-background_thread_started = False
+GRAPH_WIDTH = 800  # pixeles aprox. del grafico: limite de puntos dibujados
+GRAPH_WINDOWS = {
+    "15 minutes": 15 * 60,
+    "1 hour": 3600,
+    "1 day": 86400,
+    "1 week": 7 * 86400,
+}
+DEFAULT_WINDOW = "15 minutes"
+LOG_PAGE_SIZE = 20
 
 
 def view(app):
 
-    page = app.page
+    sampler = app.sampler
+    history = sampler.history
 
     # ----------------------------------------------------
-    # FUNCIÓN: Calcular consumo actual real
+    # GRÁFICO: un solo LineChart, reducido al ancho en pixeles
     # ----------------------------------------------------
-    def calculate_power_usage():
-        total = 0
-        for dev in models.DEVICES.values():
-
-            if dev.type == "switch" and dev.state == "ON":
-                total += 10
-
-            elif dev.type == "lock" and dev.state == "UNLOCKED":
-                total += 2
-
-            elif dev.type == "slider":
-                if dev.id == "thermostat":
-                    total += dev.state * 5
-                elif dev.id == "ceiling_fan":
-                    total += dev.state * 20
+    chart = PowerChart(width=GRAPH_WIDTH)
+    waiting = ft.Text(f"Waiting for first datapoint… ({sampler.interval:g}s)", italic=True)
+
+    window_dd = ft.Dropdown(
+        label="Window",
+        width=160,
+        options=[ft.dropdown.Option(k) for k in GRAPH_WINDOWS],
+        value=DEFAULT_WINDOW,
+    )
 
-        return total
+    def load_window():
+        window = GRAPH_WINDOWS[window_dd.value]
+        buckets = history.query(time.time() - window, max_points=chart.max_points)
+        chart.set_points([(b.ts, b.avg) for b in buckets], window=window)
+        graph_container.content = chart.control if len(chart) else waiting
 
-    # ----------------------------------------------------
-    # FUNCIÓN: Construir gráfico
-    # ----------------------------------------------------
-    def build_graph():
-        if not history:
-            return ft.Text("Waiting for first datapoint… (10s)", italic=True)
-
-        max_value = max(history) if history else 1
-
-        bars = []
-        for val in history:
-            pct = val / max_value if max_value else 0
-            bars.append(
-                ft.Container(
-                    height=100 * pct + 5,
-                    width=10,
-                    bgcolor=ft.Colors.BLUE_300,
-                    border_radius=6,
-                )
-            )
+    def on_window_change(e):
+        load_window()
+        app.request_update()
 
-        return ft.Row(bars, spacing=4, vertical_alignment="end")
+    window_dd.on_change = on_window_change
 
     # Contenedor del gráfico
     graph_container = ft.Container(
@@ -63,46 +53,52 @@ def view(app):
         padding=10,
         height=200,
         expand=True,
-        content=build_graph(),
     )
+    load_window()
 
     # ----------------------------------------------------
-    # THREADING: Ejecutar cada 10 segundos
+    # MUESTRAS EN VIVO (solo mientras /stats esta visible)
     # ----------------------------------------------------
-    def background_worker():
-        while True:
-            time.sleep(10)
-            new_val = calculate_power_usage()
-            history.append(new_val)
+    def on_sample(ts, value):
+        # Solo se añade el punto nuevo, sin reconstruir el grafico
+        chart.append(ts, value)
+        graph_container.content = chart.control
+        app.request_update()
 
-            # Limitar historial
-            if len(history) > 100:
-                history.pop(0)
-
-            graph_container.content = build_graph()
-            page.update()
-
-    global background_thread_started
-    if not background_thread_started:
-        t = threading.Thread(target=background_worker, daemon=True)
-        t.start()
-        background_thread_started = True
+    sampler.add_listener(app, on_sample)
 
     # ----------------------------------------------------
     # TABLA DE LOGS
     # ----------------------------------------------------
-    rows = []
-    for a in models.get_recent_actions(limit=20):
-        rows.append(
-            ft.DataRow(
-                cells=[
-                    ft.DataCell(ft.Text(a["time"])),
-                    ft.DataCell(ft.Text(a["device"])),
-                    ft.DataCell(ft.Text(a["action"])),
-                    ft.DataCell(ft.Text(a["user"])),
-                ]
+    # Paginacion con cursores sobre todo el log (no solo las ultimas 20)
+    log_page = {"before": None, "last": None}
+    previous_cursors = []
+
+    older_btn = ft.TextButton("Older", icon=ft.Icons.CHEVRON_LEFT)
+    newer_btn = ft.TextButton("Newer", icon=ft.Icons.CHEVRON_RIGHT)
+
+    def log_rows():
+        # Una entrada de mas: solo hay pagina anterior si existe
+        entries = list(islice(models.iter_actions(before=log_page["before"]), LOG_PAGE_SIZE + 1))
+        has_older = len(entries) > LOG_PAGE_SIZE
+        entries = entries[:LOG_PAGE_SIZE]
+        log_page["last"] = entries[-1].seq if entries else None
+        older_btn.disabled = not has_older
+        newer_btn.disabled = log_page["before"] is None
+
+        rows = []
+        for a in entries:
+            rows.append(
+                ft.DataRow(
+                    cells=[
+                        ft.DataCell(ft.Text(models.format_time(a.ts))),
+                        ft.DataCell(ft.Text(a.device)),
+                        ft.DataCell(ft.Text(a.action)),
+                        ft.DataCell(ft.Text(a.user)),
+                    ]
+                )
             )
-        )
+        return rows
 
     table = ft.DataTable(
         columns=[
@@ -111,19 +107,71 @@ def view(app):
             ft.DataColumn(ft.Text("Action")),
             ft.DataColumn(ft.Text("User")),
         ],
-        rows=rows,
+        rows=log_rows(),
     )
 
+    def show_log_page():
+        table.rows = log_rows()
+        app.request_update()
+
+    def older(e):
+        if log_page["last"] is not None:
+            previous_cursors.append(log_page["before"])
+            log_page["before"] = log_page["last"]
+            show_log_page()
+
+    def newer(e):
+        log_page["before"] = previous_cursors.pop() if previous_cursors else None
+        show_log_page()
+
+    older_btn.on_click = older
+    newer_btn.on_click = newer
+
+    def refresh_log():
+        # Solo la primera pagina sigue el log en vivo
+        if log_page["before"] is None:
+            show_log_page()
+
+    app._stats_refresh = refresh_log
+
+    def resume():
+        # Vista reutilizada desde la cache: poner al dia lo ocurrido fuera
+        load_window()
+        sampler.add_listener(app, on_sample)
+        refresh_log()
+
+    app._stats_resume = resume
+
     # ----------------------------------------------------
     # LAYOUT FINAL
     # ----------------------------------------------------
     return ft.Column(
         [
-            ft.Text("Power consumption history", size=20, weight="bold"),
+            ft.Row(
+                [ft.Text("Power consumption history", size=20, weight="bold"), window_dd],
+                alignment="spaceBetween",
+            ),
             graph_container,
             ft.Divider(),
-            ft.Text("Action log", size=20, weight="bold"),
+            ft.Row(
+                [ft.Text("Action log", size=20, weight="bold"), ft.Row([newer_btn, older_btn])],
+                alignment="spaceBetween",
+            ),
             ft.Container(content=table, padding=10, bgcolor=ft.Colors.WHITE, border_radius=6),
         ],
         scroll=ft.ScrollMode.AUTO,
     )
+
+
+def resume(app):
+    """The cached stats view is shown again: reload the chart and follow samples."""
+    resume = getattr(app, "_stats_resume", None)
+    if resume:
+        resume()
+
+
+def on_change(app, changes):
+    """Every model change adds log entries: refresh the action log table."""
+    refresh = getattr(app, "_stats_refresh", None)
+    if refresh:
+        refresh()
@@ -0,0 +1,203 @@
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict
+
+from smart_home import models
+
+
+# ================================
+# CONFIG
+# ================================
+BATCH_SIZE = 500          # eventos maximos por transaccion (un fsync por lote)
+FLUSH_INTERVAL = 0.2      # segundos que el writer espera para juntar un lote
+SNAPSHOT_EVERY = 2000     # eventos entre snapshots
+ENCODE_CHUNK = 2000       # elementos por json.dumps al escribir un snapshot
+
+_SNAPSHOT = "__snapshot__"
+_STOP = object()
+
+
+class Journal:
+    """Write-ahead, append-only journal of model changes stored in SQLite (WAL mode).
+
+    Callers only enqueue events; a background writer thread commits them in
+    batches, so the UI thread never waits on disk. Snapshots are captured and
+    encoded by the writer thread too.
+    """
+
+    def __init__(self, path: str, snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._since_snapshot = 0
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._thread = None
+
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                seq  INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                seq  INTEGER PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            """
+        )
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    # ------------------------------
+    # Lectura (arranque)
+    # ------------------------------
+    def load(self):
+        """Restore the latest snapshot and replay only the journal tail after it.
+
+        Returns the number of replayed events, or None if the store was empty.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT seq, data FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+            base = 0
+            if row:
+                base = row[0]
+                models.restore(json.loads(row[1]))
+            tail = conn.execute("SELECT kind, data FROM events WHERE seq > ? ORDER BY seq", (base,))
+            replayed = 0
+            for kind, data in tail:
+                models.apply_event(kind, json.loads(data))
+                replayed += 1
+        finally:
+            conn.close()
+        self._since_snapshot = replayed
+        if row is None and replayed == 0:
+            return None
+        return replayed
+
+    # ------------------------------
+    # Escritura
+    # ------------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+            self._thread.start()
+
+    def append(self, kind: str, data: Dict[str, Any]):
+        """Queue one change; never blocks on I/O."""
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((kind, data))
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Queue a snapshot; the writer thread takes it at this queue position."""
+        self._since_snapshot = 0
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((_SNAPSHOT, None))
+
+    def flush(self, timeout: float = None):
+        """Wait until everything queued so far is on disk."""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _writer(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            build = None
+            if any(item is not _STOP and item[0] == _SNAPSHOT for item in batch):
+                # Los eventos se encolan con el lock de models cogido: con el
+                # lock, lo que queda en la cola es justo lo anterior a la captura
+                with models._lock:
+                    while True:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    build = models.capture_snapshot()
+            if _STOP in batch:
+                stop = True
+            events = [item for item in batch if item is not _STOP and item[0] != _SNAPSHOT]
+            # La copia completa se construye aqui, fuera del lock y del hilo que escribio
+            self._write_batch(conn, events, build() if build else None)
+            with self._flushed:
+                self._pending -= sum(1 for item in batch if item is not _STOP)
+                self._flushed.notify_all()
+        conn.close()
+
+    def _write_batch(self, conn, events, snapshot=None):
+        if not events and snapshot is None:
+            return
+        with conn:
+            for kind, data in events:
+                conn.execute("INSERT INTO events (kind, data) VALUES (?, ?)",
+                             (kind, json.dumps(data)))
+            if snapshot is not None:
+                cur = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events")
+                seq = cur.fetchone()[0]
+                conn.execute("INSERT OR REPLACE INTO snapshots (seq, data) VALUES (?, ?)",
+                             (seq, _encode_snapshot(snapshot)))
+                # Compactar: lo anterior al snapshot ya no hace falta
+                conn.execute("DELETE FROM snapshots WHERE seq < ?", (seq,))
+                conn.execute("DELETE FROM events WHERE seq <= ?", (seq,))
+
+
+def _encode_snapshot(snapshot: Dict[str, Any]) -> str:
+    """json.dumps(snapshot) in chunks: a single call on 100k devices would hold
+    the GIL (and stall the UI thread) for a few hundred ms."""
+    parts = []
+    for key, items in snapshot.items():
+        chunks = []
+        for i in range(0, len(items), ENCODE_CHUNK):
+            chunk = json.dumps(items[i:i + ENCODE_CHUNK])[1:-1]
+            if chunk:
+                chunks.append(chunk)
+            time.sleep(0)  # ceder el GIL entre trozos
+        parts.append(f"{json.dumps(key)}: [{', '.join(chunks)}]")
+    return "{" + ", ".join(parts) + "}"
+
+
+def open_store(path: str, snapshot_every: int = SNAPSHOT_EVERY) -> Journal:
+    """Load persisted state into models and write every later change through the journal."""
+    journal = Journal(path, snapshot_every)
+    empty = journal.load() is None
+    journal.start()
+    models.set_journal(journal)
+    if empty:
+        # Primer arranque: guardar los devices iniciales
+        journal.snapshot()
+    atexit.register(journal.close)
+    return journal
@@ -0,0 +1,128 @@
+import threading
+from typing import Any, Dict, Set
+
+from smart_home import models
+
+
+# ================================
+# PERFILES DE CONSUMO (W)
+# ================================
+# Un perfil es un dict {estado: vatios} o un numero (vatios por unidad del valor)
+TYPE_PROFILES: Dict[str, Any] = {
+    "switch": {"ON": 10},
+    "lock": {"UNLOCKED": 2},
+    "slider": 5,
+}
+
+# Perfiles concretos por device id (tienen prioridad sobre el tipo)
+DEVICE_PROFILES: Dict[str, Any] = {
+    "thermostat": 5,
+    "ceiling_fan": 20,
+}
+
+
+def watts_for(device: models.Device) -> float:
+    profile = DEVICE_PROFILES.get(device.id, TYPE_PROFILES.get(device.type))
+    if profile is None:
+        return 0
+    if isinstance(profile, dict):
+        # Estados no hashables o desconocidos: 0 W
+        return profile.get(device.state, 0) if isinstance(device.state, str) else 0
+    try:
+        return float(device.state or 0) * profile
+    except (TypeError, ValueError):
+        return 0
+
+
+class PowerModel:
+    """Running power total (overall and per room) kept up to date by deltas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watts: Dict[str, float] = {}
+        self._rooms: Dict[str, float] = {}
+        # Rooms de cada device tal y como las ha visto este modelo (solo
+        # cambian con eventos assign/unassign, no con el estado actual)
+        self._device_rooms: Dict[str, Set[str]] = {}
+        self.total = 0.0
+        self._token = None
+
+    def attach(self):
+        """Compute the totals once and follow model changes from then on."""
+        if self._token is None:
+            self._token = models.subscribe(self.on_change)
+        self.rebuild()
+
+    def detach(self):
+        if self._token is not None:
+            models.unsubscribe(self._token)
+            self._token = None
+
+    def rebuild(self):
+        with self._lock:
+            self._watts = {d.id: watts_for(d) for d in models.all_devices()}
+            self._rooms = {}
+            self._device_rooms = {}
+            for r in models.ROOMS:
+                self._rooms[r["name"]] = sum(self._watts.get(did, 0) for did in r["device_ids"])
+                for did in r["device_ids"]:
+                    self._device_rooms.setdefault(did, set()).add(r["name"])
+            self.total = sum(self._watts.values())
+
+    def current(self) -> float:
+        return self.total
+
+    def room_total(self, room_name: str) -> float:
+        return self._rooms.get(room_name, 0)
+
+    def room_totals(self) -> Dict[str, float]:
+        return dict(self._rooms)
+
+    def on_change(self, changes):
+        if any(c.kind == "reset" for c in changes):
+            # Estado restaurado entero: los deltas ya no sirven
+            return self.rebuild()
+        with self._lock:
+            for c in changes:
+                if c.kind in ("state", "device"):
+                    d = models.DEVICES.get(c.device_id)
+                    new = watts_for(d) if d else 0
+                    delta = new - self._watts.get(c.device_id, 0)
+                    self._watts[c.device_id] = new
+                    if delta:
+                        self.total += delta
+                        # Un device nuevo aun no tiene rooms aqui: las suman sus eventos assign
+                        for room in self._device_rooms.get(c.device_id, ()):
+                            self._rooms[room] = self._rooms.get(room, 0) + delta
+                elif c.kind == "room":
+                    self._rooms.setdefault(c.room, 0)
+                elif c.kind == "assign":
+                    rooms = self._device_rooms.setdefault(c.device_id, set())
+                    if c.room not in rooms:
+                        rooms.add(c.room)
+                        self._rooms[c.room] = self._rooms.get(c.room, 0) + self._watts.get(c.device_id, 0)
+                elif c.kind == "unassign":
+                    rooms = self._device_rooms.get(c.device_id)
+                    if rooms and c.room in rooms:
+                        rooms.discard(c.room)
+                        self._rooms[c.room] = self._rooms.get(c.room, 0) - self._watts.get(c.device_id, 0)
+
+
+POWER = PowerModel()
+
+
+def _ensure_attached():
+    # Se engancha en el primer uso, cuando el estado persistido ya esta cargado
+    if POWER._token is None:
+        POWER.attach()
+
+
+def current() -> float:
+    """Current total consumption in W (O(1))."""
+    _ensure_attached()
+    return POWER.current()
+
+
+def room_total(room_name: str) -> float:
+    _ensure_attached()
+    return POWER.room_total(room_name)
@@ -0,0 +1,94 @@
+import inspect
+import threading
+import time
+from typing import Callable, Dict
+
+from smart_home import power
+from smart_home.timeseries import TimeSeries
+
+
+SAMPLE_INTERVAL = 10  # segundos
+
+
+class Sampler:
+    """Background service that samples power consumption into a shared history.
+
+    One instance serves every session. Pages that want live updates register a
+    listener (keyed by owner, usually the SmartHomeApp) while they are visible
+    and remove it when the user navigates away.
+    """
+
+    def __init__(self, history: TimeSeries = None, read: Callable[[], float] = None,
+                 interval: float = SAMPLE_INTERVAL):
+        self.history = history if history is not None else TimeSeries()
+        self.read = read or power.current
+        self.interval = interval
+        self._listeners: Dict[int, Callable[[float, float], None]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = None):
+        """Start sampling (no-op if already running)."""
+        if interval is not None:
+            self.interval = interval
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="power-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_listener(self, owner, callback: Callable[[float, float], None]):
+        """callback(ts, value) after every sample; replaces owner's previous listener."""
+        with self._lock:
+            self._listeners[id(owner)] = callback
+
+    def remove_listener(self, owner):
+        with self._lock:
+            self._listeners.pop(id(owner), None)
+
+    def _record(self):
+        ts = time.time()
+        value = self.read()
+        self.history.add(value, ts)
+        return ts, value
+
+    def _notify(self, ts: float, value: float):
+        """Call every listener; returns [(key, awaitable)] for the coroutine ones."""
+        with self._lock:
+            listeners = list(self._listeners.items())
+        pending = []
+        for key, callback in listeners:
+            try:
+                result = callback(ts, value)
+            except Exception:
+                self._drop(key)
+                continue
+            if inspect.isawaitable(result):
+                pending.append((key, result))
+        return pending
+
+    def _drop(self, key: int):
+        # Sesion cerrada o pagina rota: no volver a intentarlo
+        with self._lock:
+            self._listeners.pop(key, None)
+
+    def sample(self):
+        self._notify(*self._record())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+SAMPLER = Sampler()
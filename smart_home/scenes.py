@@ -0,0 +1,57 @@
+"""Group commands and named scenes.
+
+Every command resolves to a {device_id: state} map and goes through
+drivers.apply_states(), so N devices change in one transaction with one
+journal event, one log entry and one batch of UI changes (and, with the
+command queue running, one command per changed device).
+"""
+from typing import Any, Dict, Iterable, List
+
+from smart_home import drivers, models
+
+
+OFF_STATES: Dict[str, Any] = {"switch": "OFF", "slider": 0}
+
+# Escenas con nombre: {nombre: {device_id: estado}}
+SCENES: Dict[str, Dict[str, Any]] = {}
+
+
+# ================================
+# COMANDOS DE GRUPO
+# ================================
+def set_room(room_name: str, type: str, state: Any, user: str = "User") -> List[str]:
+    """Put every device of a type in a room into one state."""
+    states = {d.id: state for d in models.get_devices_in_room(room_name) if d.type == type}
+    return drivers.apply_states(states, user, f"{room_name}: all {type} {state}")
+
+
+def room_off(room_name: str, user: str = "User", types: Iterable[str] = ("switch",)) -> List[str]:
+    """Turn off the devices of the given types in a room (switches by default)."""
+    states = {d.id: OFF_STATES[d.type] for d in models.get_devices_in_room(room_name)
+              if d.type in types and d.type in OFF_STATES}
+    return drivers.apply_states(states, user, f"{room_name}: all off")
+
+
+def lock_all(user: str = "User") -> List[str]:
+    states = {d.id: "LOCKED" for d in models.devices_of_type("lock")}
+    return drivers.apply_states(states, user, "lock all doors")
+
+
+# ================================
+# ESCENAS
+# ================================
+def define_scene(name: str, states: Dict[str, Any]):
+    SCENES[name] = dict(states)
+
+
+def remove_scene(name: str):
+    SCENES.pop(name, None)
+
+
+def get_scenes() -> List[str]:
+    return list(SCENES)
+
+
+def activate_scene(name: str, user: str = "User") -> List[str]:
+    """Apply a named scene; raises KeyError if it does not exist."""
+    return drivers.apply_states(SCENES[name], user, f"scene {name}")
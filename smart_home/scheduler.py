@@ -0,0 +1,67 @@
+import threading
+from typing import Dict
+
+from smart_home import clock
+
+
+FRAME_INTERVAL = 0.033  # segundos (~30 fps)
+
+
+class UpdateScheduler:
+    """Coalesce page.update() calls: at most one real update per frame.
+
+    request() marks the page dirty and arms a one-shot timer; every request
+    made before the timer fires is served by the same page.update().
+    flush_now() is the escape hatch for updates that must go out immediately.
+    In asyncio mode (clock.use_loop) the timer runs on the event loop and the
+    update is sent with page.update_async() when Flet provides it.
+    """
+
+    def __init__(self, page, interval: float = FRAME_INTERVAL):
+        self.page = page
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        self.requested = 0
+        self.flushed = 0
+
+    @property
+    def coalesced(self) -> int:
+        """Requests that were absorbed by another request's flush."""
+        return self.requested - self.flushed
+
+    def request(self):
+        with self._lock:
+            self.requested += 1
+            self._dirty = True
+            if self._timer is not None:
+                return
+            if self.interval > 0:
+                self._timer = clock.call_later(self.interval, self.flush)
+                return
+        self.flush()
+
+    def flush(self):
+        """Send the pending update, if any."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            self.flushed += 1
+        update_async = getattr(self.page, "update_async", None)
+        if update_async is None or not clock.spawn(update_async()):
+            self.page.update()
+
+    def flush_now(self):
+        """Mark dirty and update right away (pending requests are included)."""
+        with self._lock:
+            self.requested += 1
+            self._dirty = True
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"requested": self.requested, "flushed": self.flushed, "coalesced": self.coalesced}
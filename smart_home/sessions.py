@@ -0,0 +1,109 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from smart_home import clock, models
+
+
+# ================================
+# CONFIG
+# ================================
+FRAME = 0.05        # segundos entre envios a cada sesion
+MAX_WORKERS = 8     # hilos que entregan cambios a las sesiones
+# Errores que significan que el cliente se ha ido (socket cerrado)
+DISCONNECT_ERRORS = (ConnectionError, EOFError)
+
+log = logging.getLogger(__name__)
+
+
+class _Session:
+    def __init__(self, app):
+        self.app = app
+        self.states: Dict[str, models.Change] = {}   # ultimo cambio de estado por device
+        self.structural: List[models.Change] = []    # rooms, asignaciones, devices nuevos
+        self.busy = False
+
+    def dirty(self) -> bool:
+        return bool(self.states or self.structural)
+
+    def take(self) -> List[models.Change]:
+        changes = self.structural + list(self.states.values())
+        self.states = {}
+        self.structural = []
+        return changes
+
+
+class SessionHub:
+    """Fan model changes out to every connected SmartHomeApp (one per ft.Page).
+
+    Changes are coalesced per session (only the latest state of each device
+    is kept) and delivered at most once per frame. A slow session keeps
+    accumulating coalesced deltas while its previous delivery is still running,
+    so it never delays the others.
+    """
+
+    def __init__(self, frame: float = FRAME, max_workers: int = MAX_WORKERS):
+        self.frame = frame
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, _Session] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session")
+        self._timer = None
+        self._token = None
+
+    def register(self, app):
+        with self._lock:
+            self._sessions[id(app)] = _Session(app)
+            if self._token is None:
+                self._token = models.subscribe(self._on_changes)
+
+    def unregister(self, app):
+        with self._lock:
+            self._sessions.pop(id(app), None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _on_changes(self, changes):
+        with self._lock:
+            for session in self._sessions.values():
+                for c in changes:
+                    if c.kind == "state":
+                        session.states[c.device_id] = c
+                    else:
+                        session.structural.append(c)
+            self._schedule()
+
+    def _schedule(self):
+        # Llamar con self._lock tomado
+        if self._timer is None:
+            self._timer = clock.call_later(self.frame, self._tick)
+
+    def _tick(self):
+        with self._lock:
+            self._timer = None
+            for session in self._sessions.values():
+                if session.dirty() and not session.busy:
+                    session.busy = True
+                    changes = session.take()
+                    # En modo asyncio se entrega en el loop, sin hilos del pool
+                    if not clock.call_soon(self._deliver, session, changes):
+                        self._pool.submit(self._deliver, session, changes)
+
+    def _deliver(self, session: _Session, changes):
+        try:
+            session.app.on_models_change(changes)
+        except DISCONNECT_ERRORS:
+            # Pagina desconectada: dejar de enviarle cambios
+            self.unregister(session.app)
+        except Exception:
+            # Bug en el codigo de la pagina: se registra y la sesion sigue recibiendo
+            log.exception("error delivering model changes to a session")
+        finally:
+            with self._lock:
+                session.busy = False
+                if session.dirty():
+                    self._schedule()
+
+
+HUB = SessionHub()
@@ -0,0 +1,105 @@
+"""Simulated device gateway, for testing the driver layer offline.
+
+Speaks the GatewayDriver protocol (newline-delimited JSON over TCP) and
+answers every request after a configurable latency, dropping some of them
+(no reply at all) and rejecting others. Requests on one connection are
+served concurrently, so replies may come back out of order.
+
+    python -m smart_home.simgateway --port 9000 --latency 0.02 --loss 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Dict, Tuple
+
+
+class SimulatedGateway:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.01,
+                 jitter: float = 0.0, loss: float = 0.0, reject: float = 0.0, seed: int = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.reject = reject
+        self.rnd = random.Random(seed)
+        self.states: Dict[str, Any] = {}
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._server = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.host, self.port
+
+    async def start(self) -> "SimulatedGateway":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port=0: el sistema elige un puerto libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.get_running_loop().create_task(self._serve(json.loads(line), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (OSError, ValueError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _serve(self, request: Dict[str, Any], writer):
+        self.received += 1
+        if self.rnd.random() < self.loss:
+            self.dropped += 1
+            return
+        await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+        if self.rnd.random() < self.reject:
+            self.rejected += 1
+            reply = {"id": request["id"], "ok": False, "error": "device busy"}
+        else:
+            self.states[request["device"]] = request["state"]
+            reply = {"id": request["id"], "ok": True, "state": request["state"]}
+        if not writer.is_closing():
+            writer.write(json.dumps(reply).encode() + b"\n")
+
+    def stats(self) -> Dict[str, int]:
+        return {"received": self.received, "dropped": self.dropped, "rejected": self.rejected}
+
+
+async def _serve_forever(gateway: SimulatedGateway):
+    await gateway.start()
+    print(f"simulated gateway on {gateway.host}:{gateway.port}")
+    await gateway._server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds on the latency")
+    parser.add_argument("--loss", type=float, default=0.0, help="fraction of requests never answered")
+    parser.add_argument("--reject", type=float, default=0.0, help="fraction of requests rejected")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve_forever(SimulatedGateway(args.host, args.port, args.latency, args.jitter,
+                                                    args.loss, args.reject, args.seed)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+import threading
+import time
+from array import array
+from typing import List, NamedTuple, Optional
+
+
+class Bucket(NamedTuple):
+    ts: float       # inicio del bucket (epoch, segundos)
+    min: float
+    max: float
+    avg: float
+    count: int
+
+
+class _Ring:
+    """Fixed-size ring of buckets stored column-wise in typed arrays (no per-sample objects)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = array("d", bytes(8 * capacity))
+        self.mn = array("d", bytes(8 * capacity))
+        self.mx = array("d", bytes(8 * capacity))
+        self.sum = array("d", bytes(8 * capacity))
+        self.cnt = array("l", bytes(array("l").itemsize * capacity))
+        self.start = 0
+        self.len = 0
+
+    def _slot(self, i: int) -> int:
+        return (self.start + i) % self.capacity
+
+    def append(self, ts, mn, mx, total, cnt):
+        if self.len < self.capacity:
+            k = self._slot(self.len)
+            self.len += 1
+        else:
+            k = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.ts[k], self.mn[k], self.mx[k], self.sum[k], self.cnt[k] = ts, mn, mx, total, cnt
+
+    def bucket(self, i: int) -> Bucket:
+        k = self._slot(i)
+        return Bucket(self.ts[k], self.mn[k], self.mx[k], self.sum[k] / self.cnt[k], self.cnt[k])
+
+    def first_ts(self) -> Optional[float]:
+        return self.ts[self.start] if self.len else None
+
+    def bisect(self, ts: float) -> int:
+        """Index of the first bucket starting at or after ts (timestamps grow monotonically)."""
+        lo, hi = 0, self.len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._slot(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class _Level:
+    def __init__(self, step: float, capacity: int):
+        self.step = step
+        self.ring = _Ring(capacity)
+        self.open_ts = None   # bucket abierto (aun acumulando)
+        self.open = [0.0, 0.0, 0.0, 0]  # min, max, sum, count
+
+    def add(self, ts: float, value: float):
+        bucket_ts = ts - ts % self.step
+        if self.open_ts is not None and bucket_ts != self.open_ts:
+            self.close()
+        if self.open_ts is None:
+            self.open_ts = bucket_ts
+            self.open = [value, value, value, 1]
+        else:
+            o = self.open
+            o[0] = min(o[0], value)
+            o[1] = max(o[1], value)
+            o[2] += value
+            o[3] += 1
+
+    def close(self):
+        if self.open_ts is not None:
+            mn, mx, total, cnt = self.open
+            self.ring.append(self.open_ts, mn, mx, total, cnt)
+            self.open_ts = None
+
+    def oldest(self) -> Optional[float]:
+        first = self.ring.first_ts()
+        return first if first is not None else self.open_ts
+
+    def query(self, start: float, end: float) -> List[Bucket]:
+        ring = self.ring
+        out = []
+        for i in range(ring.bisect(start - self.step + 1e-9), ring.len):
+            b = ring.bucket(i)
+            if b.ts > end:
+                break
+            out.append(b)
+        if self.open_ts is not None and start - self.step < self.open_ts <= end:
+            mn, mx, total, cnt = self.open
+            out.append(Bucket(self.open_ts, mn, mx, total / cnt, cnt))
+        return out
+
+
+# (segundos por bucket, buckets guardados): 1 dia en bruto, 1 semana por minuto,
+# ~3 meses por hora y 10 años por dia
+DEFAULT_LEVELS = [
+    (10, 8_640),
+    (60, 10_080),
+    (3_600, 2_400),
+    (86_400, 3_650),
+]
+
+
+class TimeSeries:
+    """Bounded-memory time series with min/max/avg rollups at several resolutions."""
+
+    def __init__(self, levels=None):
+        self._lock = threading.Lock()
+        self.levels = [_Level(step, cap) for step, cap in (levels or DEFAULT_LEVELS)]
+        self.last = None  # (ts, value) de la ultima muestra
+
+    def add(self, value: float, ts: float = None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for level in self.levels:
+                level.add(ts, value)
+            self.last = (ts, value)
+
+    def __len__(self):
+        raw = self.levels[0]
+        return raw.ring.len + (1 if raw.open_ts is not None else 0)
+
+    def query(self, start: float, end: float = None, max_points: int = None) -> List[Bucket]:
+        """Buckets overlapping [start, end] at the finest resolution that still has data
+        for start and, if max_points is given, returns no more than max_points buckets.
+        """
+        end = time.time() if end is None else end
+        with self._lock:
+            chosen = self.levels[-1]
+            for level in self.levels:
+                oldest = level.oldest()
+                covers = oldest is not None and oldest <= start
+                fits = max_points is None or (end - start) / level.step <= max_points
+                if covers and fits:
+                    chosen = level
+                    break
+            else:
+                # Ningun nivel cubre todo el rango: el mas fino que quepa
+                for level in self.levels:
+                    if max_points is None or (end - start) / level.step <= max_points:
+                        chosen = level
+                        break
+            return chosen.query(start, end)
+
+    def values(self, start: float, end: float = None, max_points: int = None) -> List[float]:
+        return [b.avg for b in self.query(start, end, max_points)]
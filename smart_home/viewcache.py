@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+VIEW_CACHE_SIZE = 8              # rutas
+VIEW_CACHE_MAX_CONTROLS = 20_000  # controles en total (aprox.)
+
+
+def control_count(control) -> int:
+    """Number of controls in a Flet control tree (rough memory weight)."""
+    count = 0
+    stack = [control]
+    while stack:
+        c = stack.pop()
+        if c is None:
+            continue
+        count += 1
+        for attr in ("controls", "rows", "cells"):
+            children = getattr(c, attr, None)
+            if isinstance(children, list):
+                stack.extend(children)
+        content = getattr(c, "content", None)
+        if content is not None and not isinstance(content, (str, list)):
+            stack.append(content)
+    return count
+
+
+class _Entry:
+    __slots__ = ("stamp", "control", "weight")
+
+    def __init__(self, stamp, control, weight):
+        self.stamp = stamp
+        self.control = control
+        self.weight = weight
+
+
+class ViewCache:
+    """LRU of built views, keyed by route and validated by a version stamp.
+
+    get() returns the cached control when the stamp the caller computes from
+    the models is still the one it was built with, and calls build()
+    otherwise. The least recently used views are dropped when there are more
+    than max_entries of them or their controls add up to more than
+    max_controls (weights are measured when a view is stored).
+    """
+
+    def __init__(self, max_entries: int = VIEW_CACHE_SIZE, max_controls: int = VIEW_CACHE_MAX_CONTROLS):
+        self.max_entries = max_entries
+        self.max_controls = max_controls
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, stamp: Any, build: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry.stamp == stamp:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.control
+        self.misses += 1
+        if entry is not None:
+            self.stale += 1
+        control = build()
+        self.put(key, stamp, control)
+        return control
+
+    def put(self, key: Hashable, stamp: Any, control: Any):
+        self.discard(key)
+        entry = self._entries[key] = _Entry(stamp, control, control_count(control))
+        self.weight += entry.weight
+        # Nunca se expulsa la vista recien guardada
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self.weight > self.max_controls):
+            _, old = self._entries.popitem(last=False)
+            self.weight -= old.weight
+            self.evictions += 1
+
+    def restamp(self, key: Hashable, stamp: Any):
+        """The view was patched in place: it is valid for the new stamp."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.stamp = stamp
+
+    def discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry.weight
+
+    def clear(self):
+        self._entries.clear()
+        self.weight = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "controls": self.weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+        }